@@ -0,0 +1,175 @@
+# aggregates.py
+"""
+Tabelas agregadas de fact_sales para o modelo do Power BI.
+
+    agg_sales_day_category_territory: date_key x categoria do produto x território
+    agg_sales_month_salesperson:      mês (AAAAMM) x vendedor
+
+Em vez de REFRESH MATERIALIZED VIEW (que relê a tabela de fatos inteira), a
+carga informa os date_key que gravou e só os meses deles são recalculados:
+DELETE do mês + INSERT ... SELECT agregando fact_sales restrito a ele (a
+poda de partições limita a leitura à partição do mês). Recalcular o mês
+inteiro, e não somar o delta, mantém o agregado certo quando uma linha já
+carregada é atualizada, e um mês carregado antes dos agregados existirem
+(DW já populado, gen_synthetic) fica completo na primeira carga que o
+tocar. check() confere contagem e totais de cada agregado contra a base,
+por mês; backfill() recalcula todos os meses de fact_sales.
+"""
+
+from sqlalchemy import text
+
+from partitions import month_bounds
+
+AGG_DDL = """
+CREATE TABLE IF NOT EXISTS agg_sales_day_category_territory (
+  date_key INTEGER NOT NULL,
+  category TEXT,
+  territory_key INTEGER,
+  line_count BIGINT NOT NULL,
+  order_count BIGINT NOT NULL,
+  order_qty BIGINT,
+  line_total NUMERIC,
+  gross_margin NUMERIC
+);
+CREATE INDEX IF NOT EXISTS ix_agg_sales_day_date ON agg_sales_day_category_territory (date_key);
+CREATE TABLE IF NOT EXISTS agg_sales_month_salesperson (
+  month INTEGER NOT NULL,
+  salesperson_key INTEGER,
+  line_count BIGINT NOT NULL,
+  order_count BIGINT NOT NULL,
+  order_qty BIGINT,
+  line_total NUMERIC,
+  gross_margin NUMERIC
+);
+CREATE INDEX IF NOT EXISTS ix_agg_sales_month ON agg_sales_month_salesperson (month)
+"""
+
+MEASURES = """
+       COUNT(*) AS line_count, COUNT(DISTINCT f.order_key) AS order_count,
+       SUM(f.order_qty) AS order_qty, SUM(f.line_total) AS line_total, SUM(f.gross_margin) AS gross_margin
+"""
+
+DAY_INSERT = """
+INSERT INTO agg_sales_day_category_territory
+  (date_key, category, territory_key, line_count, order_count, order_qty, line_total, gross_margin)
+SELECT f.date_key, p.category, f.territory_key, """ + MEASURES + """
+FROM fact_sales f
+LEFT JOIN dim_product p ON p.product_key = f.product_key
+WHERE {where}
+GROUP BY f.date_key, p.category, f.territory_key
+"""
+
+MONTH_INSERT = """
+INSERT INTO agg_sales_month_salesperson
+  (month, salesperson_key, line_count, order_count, order_qty, line_total, gross_margin)
+SELECT :month, f.salesperson_key, """ + MEASURES + """
+FROM fact_sales f
+WHERE f.date_key >= :lo AND f.date_key < :hi
+GROUP BY f.salesperson_key
+"""
+
+# totais por mês: base x agregado (linhas, quantidade, valor, margem)
+CHECK_QUERY = """
+WITH base AS (
+  SELECT f.date_key / 100 AS month, COUNT(*) AS line_count, SUM(f.order_qty) AS order_qty,
+         SUM(f.line_total) AS line_total, SUM(f.gross_margin) AS gross_margin
+  FROM fact_sales f
+  WHERE f.date_key >= :lo AND f.date_key < :hi
+  GROUP BY 1
+), agg AS (
+  SELECT {month} AS month, SUM(line_count) AS line_count, SUM(order_qty) AS order_qty,
+         SUM(line_total) AS line_total, SUM(gross_margin) AS gross_margin
+  FROM {table}
+  WHERE {month} >= :lo / 100 AND {month} < :hi / 100
+  GROUP BY 1
+)
+SELECT COALESCE(base.month, agg.month) AS month,
+       base.line_count AS base_lines, agg.line_count AS agg_lines,
+       base.line_total AS base_total, agg.line_total AS agg_total
+FROM base FULL JOIN agg ON agg.month = base.month
+WHERE base.line_count IS DISTINCT FROM agg.line_count
+   OR base.order_qty IS DISTINCT FROM agg.order_qty
+   OR base.line_total IS DISTINCT FROM agg.line_total
+   OR base.gross_margin IS DISTINCT FROM agg.gross_margin
+ORDER BY 1
+"""
+
+# agregado -> expressão do mês AAAAMM
+AGG_TABLES = {
+    'agg_sales_day_category_territory': 'date_key / 100',
+    'agg_sales_month_salesperson': 'month',
+}
+
+
+def ensure_aggregate_tables(conn):
+    for stmt in AGG_DDL.split(';'):
+        if stmt.strip():
+            conn.execute(text(stmt))
+
+
+def refresh(conn, date_keys=(), months=()):
+    """
+    Recalcula os agregados dos meses AAAAMM `months` e dos meses dos dias
+    `date_keys`, inteiros, a partir de fact_sales. Retorna os meses recalculados.
+    """
+    all_months = sorted({int(m) for m in months} | {int(d) // 100 for d in date_keys})
+    for month in all_months:
+        lo, hi = month_bounds(month)
+        params = {'month': month, 'lo': lo, 'hi': hi}
+        conn.execute(text("DELETE FROM agg_sales_day_category_territory WHERE date_key >= :lo AND date_key < :hi"),
+                     params)
+        conn.execute(text(DAY_INSERT.format(where="f.date_key >= :lo AND f.date_key < :hi")), params)
+        conn.execute(text("DELETE FROM agg_sales_month_salesperson WHERE month = :month"), params)
+        conn.execute(text(MONTH_INSERT), params)
+    return all_months
+
+
+def refresh_products(conn, product_keys):
+    """Recalcula os meses com fatos dos produtos `product_keys` (ex.: inferidos que acabaram de ser preenchidos)."""
+    if not product_keys:
+        return []
+    days = [row[0] for row in conn.execute(text(
+        "SELECT DISTINCT date_key FROM fact_sales WHERE product_key = ANY(:keys)"
+    ), {'keys': list(product_keys)})]
+    return refresh(conn, days)
+
+
+def fact_months(conn):
+    """Meses AAAAMM com linhas em fact_sales."""
+    return [row[0] for row in conn.execute(text("SELECT DISTINCT date_key / 100 FROM fact_sales ORDER BY 1"))]
+
+
+def check(conn, months):
+    """Meses em que algum agregado não bate com fact_sales: [(tabela, linha)] ([] = consistente)."""
+    diffs = []
+    for month in sorted({int(m) for m in months}):
+        lo, hi = month_bounds(month)
+        for table, month_expr in AGG_TABLES.items():
+            rows = conn.execute(text(CHECK_QUERY.format(table=table, month=month_expr)),
+                                {'lo': lo, 'hi': hi}).fetchall()
+            diffs.extend((table, row) for row in rows)
+    return diffs
+
+
+def refresh_and_check(conn, date_keys=(), months=()):
+    """refresh + check dos meses tocados; inconsistência interrompe a transação da carga."""
+    touched = refresh(conn, date_keys, months)
+    diffs = check(conn, touched)
+    if diffs:
+        for table, row in diffs:
+            print(f"{table} {row.month}: base {row.base_lines} linhas / {row.base_total}, "
+                  f"agregado {row.agg_lines} linhas / {row.agg_total}")
+        raise RuntimeError(f"agregados inconsistentes com fact_sales em {len(diffs)} mês(es)")
+    print(f"agregados: {len(touched)} meses recalculados, consistentes com fact_sales")
+    return touched
+
+
+def backfill(conn):
+    """Recalcula os agregados de todos os meses de fact_sales (ex.: DW populado antes deles)."""
+    ensure_aggregate_tables(conn)
+    # meses que só restam no agregado (sem fatos) também saem
+    stale = [row[0] for row in conn.execute(text(
+        "SELECT DISTINCT month FROM agg_sales_month_salesperson "
+        "UNION SELECT DISTINCT date_key / 100 FROM agg_sales_day_category_territory"
+    ))]
+    return refresh_and_check(conn, months=set(fact_months(conn)) | set(stale))
@@ -0,0 +1,174 @@
+# batches.py
+"""
+Checkpoint por lote da carga de fatos (dw.etl_batches).
+
+Cada chunk carregado gera uma linha no ledger, gravada na mesma transação
+das linhas do fato: faixa de ids da origem, maior modifieddate, número de
+linhas e os date_key que o lote alterou (gravados + de onde saíram linhas que
+mudaram de mês). Uma execução é identificada pelo job + marca d'água de
+partida; como a marca d'água só avança no fim, uma execução que caiu no meio
+é retomada pela seguinte com a mesma chave: os lotes já gravados são pulados
+(a extração recomeça depois do último id deles) e a numeração continua do
+primeiro lote que faltou. Linhas de ids já gravados que mudaram depois do
+último modifieddate visto pelos lotes (resume_modified) voltam para a
+extração: a marca d'água restaurada passa desse modifieddate e, sem isso,
+elas nunca seriam carregadas. No fim, complete() marca a execução como
+concluída na mesma transação da marca d'água, e uma carga completa posterior
+(mesma marca inicial) não é confundida com retomada.
+
+Com lotes gravados em paralelo eles podem terminar fora de ordem: só o
+prefixo contínuo (0, 1, 2, ...) conta para a retomada, e os lotes depois de
+um buraco são recarregados (upsert idempotente na chave natural). As linhas
+deles ficam no ledger e o novo registro junta os date_key aos antigos: os dias
+de onde uma carga anterior já tirou linhas não se perdem para os agregados.
+"""
+
+import pandas as pd
+from sqlalchemy import text
+
+from db import execute_prepared
+
+BATCHES_DDL = """
+CREATE SCHEMA IF NOT EXISTS dw;
+CREATE TABLE IF NOT EXISTS dw.etl_batches (
+  job TEXT NOT NULL,
+  run_key TEXT NOT NULL,
+  batch_no INTEGER NOT NULL,
+  run_id TEXT NOT NULL,
+  first_id BIGINT NOT NULL,
+  last_id BIGINT NOT NULL,
+  max_modified TIMESTAMP,
+  row_count BIGINT NOT NULL,
+  date_keys INTEGER[],
+  completed BOOLEAN NOT NULL DEFAULT false,
+  committed_at TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (job, run_key, batch_no)
+)
+"""
+
+# um registro por lote, em toda carga: prepared statement (db.execute_prepared)
+RECORD_SQL = """
+    INSERT INTO dw.etl_batches (job, run_key, batch_no, run_id, first_id, last_id, max_modified,
+                                row_count, date_keys)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+    ON CONFLICT (job, run_key, batch_no) DO UPDATE SET
+      run_id = EXCLUDED.run_id, first_id = EXCLUDED.first_id, last_id = EXCLUDED.last_id,
+      max_modified = EXCLUDED.max_modified, row_count = EXCLUDED.row_count,
+      date_keys = dw.etl_batches.date_keys || EXCLUDED.date_keys,
+      committed_at = now()
+"""
+
+# resume_id sem retomada (ids da origem são positivos)
+NO_RESUME = -1
+# parâmetros :resume_id / :resume_modified da extração sem retomada
+NO_RESUME_PARAMS = {'resume_id': NO_RESUME, 'resume_modified': None}
+
+
+def ensure_batches_table(conn):
+    for stmt in BATCHES_DDL.split(';'):
+        if stmt.strip():
+            conn.execute(text(stmt))
+
+
+class BatchLedger:
+    """
+    open(conn, marca inicial) carrega os lotes já gravados da execução;
+    batch(ids, modificados) numera o próximo lote; record(conn, lote, df) grava
+    o registro na transação da carga; complete(conn) encerra a execução.
+    """
+
+    def __init__(self, job, run_id):
+        self.job = job
+        self.run_id = run_id
+        self.run_key = None
+        self.resume_id = NO_RESUME
+        self.resume_modified = None
+        self.next_batch = 0
+        self.committed = []
+
+    def open(self, conn, last_id, last_modified):
+        ensure_batches_table(conn)
+        self.run_key = f"{int(last_id)}|{pd.Timestamp(last_modified).isoformat()}"
+        rows = conn.execute(text("""
+            SELECT batch_no, last_id, max_modified, row_count
+            FROM dw.etl_batches
+            WHERE job = :job AND run_key = :run_key AND NOT completed
+            ORDER BY batch_no
+        """), {'job': self.job, 'run_key': self.run_key}).fetchall()
+        prefix = []
+        for row in rows:
+            if row.batch_no != len(prefix):
+                break
+            prefix.append(row)
+        self.committed = prefix
+        self.next_batch = len(prefix)
+        self.resume_id = max((r.last_id for r in prefix), default=NO_RESUME)
+        self.resume_modified = max((r.max_modified for r in prefix if r.max_modified is not None), default=None)
+        if prefix:
+            print(f"{self.job}: retomando depois de {len(prefix)} lotes já gravados "
+                  f"({sum(r.row_count for r in prefix)} linhas, até id {self.resume_id})")
+        return self.resume_params()
+
+    def resume_params(self):
+        """Parâmetros da extração: id > :resume_id OR modifieddate > :resume_modified."""
+        return {'resume_id': self.resume_id, 'resume_modified': self.resume_modified}
+
+    def restore(self, mark):
+        """Leva para a marca d'água o que os lotes já gravados viram."""
+        for row in self.committed:
+            mark.last_id = max(mark.last_id, int(row.last_id))
+            if row.max_modified is not None:
+                mark.last_modified = max(mark.last_modified, row.max_modified)
+        return mark
+
+    def date_keys(self, conn):
+        """date_key alterados por todos os lotes gravados da execução (agregados da execução inteira)."""
+        return {int(d) for (d,) in conn.execute(text("""
+            SELECT DISTINCT unnest(date_keys)
+            FROM dw.etl_batches
+            WHERE job = :job AND run_key = :run_key AND NOT completed
+        """), {'job': self.job, 'run_key': self.run_key})}
+
+    def skip(self, chunks, id_col, modified_col):
+        """
+        Descarta as linhas já gravadas de chunks que não vêm da consulta filtrada,
+        com a mesma regra dela (fica id > resume_id ou modifieddate > resume_modified).
+        """
+        for chunk in chunks:
+            if self.resume_id != NO_RESUME:
+                keep = chunk[id_col] > self.resume_id
+                if self.resume_modified is not None:
+                    keep |= pd.to_datetime(chunk[modified_col]) > self.resume_modified
+                chunk = chunk[keep]
+            if len(chunk):
+                yield chunk
+
+    def batch(self, ids, modified):
+        """Próximo lote (na ordem da extração) com a faixa de ids e o maior modifieddate."""
+        batch = {
+            'batch_no': self.next_batch,
+            'first_id': int(ids.min()),
+            'last_id': int(ids.max()),
+            'max_modified': pd.to_datetime(modified).max().to_pydatetime(),
+        }
+        self.next_batch += 1
+        return batch
+
+    def record(self, conn, batch, df, date_col=None, extra_date_keys=()):
+        """
+        Registra o lote carregado em `df` na transação de `conn`; `extra_date_keys`:
+        outros dias que o lote alterou (ex.: linhas removidas de outro mês).
+        """
+        date_keys = (sorted({int(d) for d in df[date_col].dropna().unique()} | {int(d) for d in extra_date_keys})
+                     if date_col else None)
+        execute_prepared(conn, 'etl_batches_record', RECORD_SQL, [(
+            self.job, self.run_key, batch['batch_no'], self.run_id, batch['first_id'], batch['last_id'],
+            batch['max_modified'], len(df), date_keys,
+        )])
+
+    def complete(self, conn):
+        """Marca a execução como concluída (junto com a marca d'água)."""
+        conn.execute(text("""
+            UPDATE dw.etl_batches SET completed = true
+            WHERE job = :job AND run_key = :run_key AND NOT completed
+        """), {'job': self.job, 'run_key': self.run_key})
@@ -0,0 +1,107 @@
+# bench_bulk_load.py
+"""
+Benchmark: upsert linha a linha (iterrows + INSERT por linha), em lotes
+(execute_values / prepared statement, db.py) e COPY + staging.
+
+Uso:
+    python bench_bulk_load.py [linhas] [dsn]
+Padrão: 20000 linhas no DW de etl_adventure_dw.py. Usa uma tabela temporária,
+nada é gravado de forma permanente.
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from bulk_load import bulk_upsert
+from db import dsn, execute_prepared, execute_values, get_engine
+
+DEFAULT_DSN = dsn('dw')
+
+DDL = """
+CREATE TEMP TABLE bench_dim (
+  bench_key SERIAL PRIMARY KEY,
+  bench_id INTEGER UNIQUE,
+  name TEXT,
+  category TEXT,
+  price NUMERIC
+)
+"""
+
+
+def make_frame(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'bench_id': np.arange(1, n + 1),
+        'name': 'item-' + pd.Series(np.arange(1, n + 1)).astype(str),
+        'category': rng.choice(['Bikes', 'Components', 'Clothing', 'Accessories'], n),
+        'price': rng.uniform(1, 500, n).round(2),
+    })
+
+
+def row_by_row(conn, df):
+    # caminho antigo de upsert_dim: monta o SQL e executa uma vez por linha
+    for _, row in df.iterrows():
+        cols = row.index.tolist()
+        updates = ','.join(f"{c}=EXCLUDED.{c}" for c in cols if c != 'bench_id')
+        sql = f"""
+        INSERT INTO bench_dim ({','.join(cols)})
+        VALUES ({','.join(':' + c for c in cols)})
+        ON CONFLICT (bench_id) DO UPDATE SET {updates}
+        """
+        conn.execute(text(sql), row.to_dict())
+
+
+COLUMNS = ['bench_id', 'name', 'category', 'price']
+UPDATES = ','.join(f"{c}=EXCLUDED.{c}" for c in COLUMNS if c != 'bench_id')
+
+
+def batched(conn, df):
+    # um INSERT multi-VALUES por página de linhas
+    execute_values(conn, f"""
+        INSERT INTO bench_dim ({','.join(COLUMNS)}) VALUES %s
+        ON CONFLICT (bench_id) DO UPDATE SET {UPDATES}
+    """, list(df[COLUMNS].itertuples(index=False, name=None)))
+
+
+def prepared(conn, df):
+    # plano preparado uma vez na conexão; só EXECUTE por linha, enviados em lotes
+    execute_prepared(conn, 'bench_upsert', f"""
+        INSERT INTO bench_dim ({','.join(COLUMNS)}) VALUES ($1, $2, $3, $4)
+        ON CONFLICT (bench_id) DO UPDATE SET {UPDATES}
+    """, list(df[COLUMNS].itertuples(index=False, name=None)))
+
+
+def bulk(conn, df):
+    bulk_upsert(conn, 'bench_dim', df, 'bench_id')
+
+
+def run(fn, engine, df):
+    with engine.begin() as conn:
+        conn.execute(text(DDL))
+        t0 = time.perf_counter()
+        fn(conn, df)
+        elapsed = time.perf_counter() - t0
+        conn.execute(text("DROP TABLE bench_dim"))
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    url = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DSN
+    engine = get_engine(url)
+    df = make_frame(n)
+
+    results = {}
+    for name, fn in [('iterrows', row_by_row), ('values', batched), ('prepared', prepared), ('copy', bulk)]:
+        elapsed = run(fn, engine, df)
+        results[name] = elapsed
+        print(f"{name:10s} {n} linhas em {elapsed:8.2f}s -> {n / elapsed:12,.0f} linhas/s")
+    print(f"speedup: {results['iterrows'] / results['copy']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
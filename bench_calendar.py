@@ -0,0 +1,59 @@
+# bench_calendar.py
+"""
+Benchmark do date_key: caminho por string (strftime) vs aritmética inteira.
+
+Uso:
+    python bench_calendar.py [linhas]
+Não precisa de banco de dados.
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from calendar_dim import build_calendar, date_keys
+
+
+def apply_strftime(dates):
+    # caminho antigo de etl_adventure_dw.py (lambda por linha)
+    return dates.dt.date.apply(lambda d: int(d.strftime('%Y%m%d')))
+
+
+def dt_strftime(dates):
+    # caminho antigo de sqlalchemy.py
+    return dates.dt.strftime('%Y%m%d').astype(int)
+
+
+def integer(dates):
+    return date_keys(dates)
+
+
+def timeit(fn, dates):
+    t0 = time.perf_counter()
+    out = fn(dates)
+    return time.perf_counter() - t0, np.asarray(out)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(42)
+    cal = build_calendar('2000-01-01', '2030-12-31')
+    dates = pd.Series(cal['full_date'].to_numpy()[rng.integers(0, len(cal), n)])
+
+    expected = None
+    for name, fn in [('apply+strftime', apply_strftime), ('dt.strftime', dt_strftime), ('inteiro', integer)]:
+        elapsed, out = timeit(fn, dates)
+        if expected is None:
+            expected = out
+        assert (out == expected).all(), name
+        print(f"{name:15s} {n} linhas em {elapsed:8.3f}s -> {n / elapsed:14,.0f} linhas/s")
+
+    t0 = time.perf_counter()
+    build_calendar('2000-01-01', '2030-12-31')
+    print(f"build_calendar 2000-2030: {time.perf_counter() - t0:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# bench_etl.py
+"""
+Benchmark reprodutível dos ETLs contra um PostgreSQL local descartável.
+
+Sobe um cluster temporário (initdb + pg_ctl num diretório temporário, socket
+unix, sem rede), cria a fonte AdventureWorks (só as tabelas/colunas usadas
+pelos ETLs, populadas com generate_series num fator de escala) e os DWs
+(create_dw_schema.sql + create_dim_date.sql para etl_adventure_dw.py e o
+schema dw.* esperado por sqlalchemy.py). Mede build_and_load_dims,
+load_fact_sales e etl() de ponta a ponta e por etapa (metrics.py) e grava um
+JSON por execução em bench_results/, identificado pelo commit.
+
+Uso:
+    python bench_etl.py --scale 10k
+    python bench_etl.py --scale 1m --keep
+    python bench_etl.py --scale 10k --dsn-base postgresql+psycopg2://postgres@localhost:5432
+
+Precisa de initdb/pg_ctl no PATH (ou --dsn-base para um servidor existente).
+SQLite não serve de substituto: os loaders usam COPY e ON CONFLICT do PostgreSQL.
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# O sqlalchemy.py deste repositório sombreia o pacote SQLAlchemy quando o
+# diretório do script está no sys.path: importa o pacote real primeiro e só
+# depois expõe os módulos do repositório.
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path = [p for p in sys.path if os.path.abspath(p or '.') != HERE]
+import sqlalchemy  # noqa: E402  (pacote real)
+from sqlalchemy import create_engine, text  # noqa: E402
+sys.path.append(HERE)
+from db import get_engine  # noqa: E402
+
+# linhas de venda (sales_salesorderdetail) por fator de escala
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+RESULTS_DIR = os.path.join(HERE, 'bench_results')
+
+# Fonte: só o que as consultas dos dois ETLs leem
+SOURCE_DDL = """
+CREATE TABLE production_productcategory (productcategoryid INT PRIMARY KEY, name TEXT);
+CREATE TABLE production_productsubcategory (productsubcategoryid INT PRIMARY KEY, productcategoryid INT, name TEXT);
+CREATE TABLE production_product (
+  productid INT PRIMARY KEY, name TEXT, productnumber TEXT, color TEXT, size TEXT,
+  standardcost NUMERIC(12,4), listprice NUMERIC(12,4), discontinued BOOLEAN, productsubcategoryid INT);
+CREATE TABLE person_person (businessentityid INT PRIMARY KEY, firstname TEXT, lastname TEXT, emailaddress TEXT);
+CREATE TABLE sales_store (businessentityid INT PRIMARY KEY, name TEXT);
+CREATE TABLE sales_customer (customerid INT PRIMARY KEY, personid INT, storeid INT, accountnumber TEXT);
+CREATE TABLE person_countryregion (countryregioncode TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE person_stateprovince (stateprovinceid INT PRIMARY KEY, countryregioncode TEXT);
+CREATE TABLE person_address (businessentityid INT, stateprovinceid INT);
+CREATE TABLE address (addressid INT PRIMARY KEY, city TEXT, stateprovince TEXT, countryregioncode TEXT, postalcode TEXT);
+CREATE TABLE sales_customeraddress (customerid INT, addressid INT);
+CREATE TABLE humanresources_employee (businessentityid INT PRIMARY KEY, salespersonid INT, jobtitle TEXT);
+CREATE TABLE sales_salesterritory (territoryid INT PRIMARY KEY, name TEXT, countryregioncode TEXT);
+CREATE VIEW sales_territory AS SELECT * FROM sales_salesterritory;
+CREATE TABLE sales_salesorderheader (
+  salesorderid INT PRIMARY KEY, orderdate TIMESTAMP, duedate TIMESTAMP, shipdate TIMESTAMP, status INT,
+  salespersonid INT, territoryid INT, customerid INT);
+CREATE TABLE sales_salesorderdetail (
+  salesorderdetailid INT PRIMARY KEY, salesorderid INT, productid INT, orderqty INT,
+  unitprice NUMERIC(12,4), unitpricediscount NUMERIC(12,4), modifieddate TIMESTAMP);
+"""
+
+# Popula a fonte com generate_series; :lines, :orders, :customers, :products, :employees
+SOURCE_SEED = """
+SELECT setseed(0.42);
+INSERT INTO production_productcategory VALUES (1,'Bikes'),(2,'Components'),(3,'Clothing'),(4,'Accessories');
+INSERT INTO production_productsubcategory SELECT i, 1 + i % 4, 'Sub ' || i FROM generate_series(1, 37) i;
+INSERT INTO production_product
+  SELECT i, 'Product ' || i, 'PN-' || i, (ARRAY['Red','Black','Silver','Blue',NULL])[1 + i % 5],
+         (ARRAY['S','M','L','XL'])[1 + i % 4], round((10 + random() * 500)::numeric, 4),
+         round((20 + random() * 1500)::numeric, 4), i % 17 = 0, 1 + i % 37
+  FROM generate_series(1, :products) i;
+INSERT INTO person_person
+  SELECT i, 'First' || i, 'Last' || i, 'p' || i || '@example.com' FROM generate_series(1, :customers + :employees) i;
+INSERT INTO sales_store SELECT i, 'Store ' || i FROM generate_series(1, :customers / 10) i;
+INSERT INTO sales_customer
+  SELECT i, CASE WHEN i % 10 <> 0 THEN i END, CASE WHEN i % 10 = 0 THEN i / 10 END, 'AW' || lpad(i::text, 8, '0')
+  FROM generate_series(1, :customers) i;
+INSERT INTO person_countryregion VALUES ('US','United States'),('CA','Canada'),('FR','France'),('DE','Germany'),('AU','Australia'),('GB','United Kingdom');
+INSERT INTO person_stateprovince SELECT i, (ARRAY['US','CA','FR','DE','AU','GB'])[1 + i % 6] FROM generate_series(1, 60) i;
+INSERT INTO person_address SELECT i, 1 + i % 60 FROM generate_series(1, :customers) i;
+INSERT INTO address
+  SELECT i, 'City ' || (i % 500), 'State ' || (i % 60), (ARRAY['US','CA','FR','DE','AU','GB'])[1 + i % 6], lpad((i % 99999)::text, 5, '0')
+  FROM generate_series(1, :customers) i;
+INSERT INTO sales_customeraddress SELECT i, i FROM generate_series(1, :customers) i;
+INSERT INTO humanresources_employee
+  SELECT :customers + i, :customers + i, (ARRAY['Sales Representative','Sales Manager','Engineer'])[1 + i % 3]
+  FROM generate_series(1, :employees) i;
+INSERT INTO sales_salesterritory
+  SELECT i, (ARRAY['Northwest','Northeast','Central','Southwest','Southeast','Canada','France','Germany','Australia','United Kingdom'])[i],
+         (ARRAY['US','US','US','US','US','CA','FR','DE','AU','GB'])[i]
+  FROM generate_series(1, 10) i;
+INSERT INTO sales_salesorderheader
+  SELECT i, d, d + interval '12 days', d + interval '7 days', 5,
+         CASE WHEN i % 4 = 0 THEN NULL ELSE :customers + 1 + i % :employees END,
+         1 + i % 10, 1 + (i * 7919) % :customers
+  FROM (SELECT i, timestamp '2011-05-31' + (i % 3650) * interval '1 day' AS d
+        FROM generate_series(1, :orders) i) o;
+INSERT INTO sales_salesorderdetail
+  SELECT i, 1 + (i - 1) % :orders, 1 + (i * 31) % :products, 1 + i % 5,
+         round((20 + random() * 1500)::numeric, 4), (ARRAY[0, 0, 0, 0.02, 0.05])[1 + i % 5],
+         timestamp '2011-05-31' + (((i - 1) % :orders) % 3650) * interval '1 day'
+  FROM generate_series(1, :lines) i;
+ANALYZE;
+"""
+
+# Schema dw.* usado por sqlalchemy.py (não há script SQL dele no repositório)
+DW_SQLALCHEMY_DDL = """
+CREATE SCHEMA dw;
+CREATE TABLE dw.dim_date (
+  date_id INT PRIMARY KEY, date DATE, year INT, quarter INT, month INT, month_name TEXT,
+  day INT, day_of_week INT, day_name TEXT, is_weekend BOOLEAN);
+CREATE TABLE dw.dim_product (
+  product_id INT PRIMARY KEY, product_name TEXT, productnumber TEXT, brand TEXT, color TEXT,
+  standardcost NUMERIC, listprice NUMERIC, category TEXT, subcategory TEXT);
+CREATE TABLE dw.dim_customer (
+  customer_id INT PRIMARY KEY, customer_name TEXT, account_number TEXT, city TEXT,
+  state_province TEXT, country TEXT, postal_code TEXT);
+CREATE TABLE dw.dim_employee (employee_id INT PRIMARY KEY, employee_name TEXT, job_title TEXT);
+CREATE TABLE dw.dim_territory (territory_id INT PRIMARY KEY, territory_name TEXT, region TEXT);
+CREATE TABLE dw.fact_sales (
+  order_id INT, order_line_id INT, date_id INT, product_id INT, customer_id INT,
+  employee_id INT, territory_id INT, quantity INT, unit_price NUMERIC, line_total NUMERIC, unit_cost NUMERIC);
+"""
+
+
+def run_sql(engine, sql, params=None):
+    # tira comentários -- antes de separar os comandos (podem conter ';')
+    sql = re.sub(r'--[^\n]*', '', sql)
+    with engine.begin() as conn:
+        for stmt in sql.split(';'):
+            if stmt.strip():
+                conn.execute(text(stmt), params or {})
+
+
+def sql_file(name):
+    with open(os.path.join(HERE, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def load_module(name, filename):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class TempPostgres:
+    """Cluster PostgreSQL descartável num diretório temporário (socket unix)."""
+
+    def __init__(self, port=55432, keep=False):
+        for tool in ('initdb', 'pg_ctl'):
+            if shutil.which(tool) is None:
+                raise RuntimeError(f"{tool} não encontrado no PATH (ou use --dsn-base)")
+        self.port = port
+        self.keep = keep
+        self.dir = tempfile.mkdtemp(prefix='etl_bench_pg_')
+        self.data = os.path.join(self.dir, 'data')
+
+    def __enter__(self):
+        subprocess.run(['initdb', '-D', self.data, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'],
+                       check=True, stdout=subprocess.DEVNULL)
+        opts = f"-p {self.port} -k {self.dir} -c listen_addresses='' -c fsync=off -c max_wal_size=4GB"
+        subprocess.run(['pg_ctl', '-D', self.data, '-o', opts, '-l', os.path.join(self.dir, 'pg.log'), '-w', 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        return self
+
+    def dsn(self, db):
+        return f"postgresql+psycopg2://postgres@/{db}?host={self.dir}&port={self.port}"
+
+    def __exit__(self, *exc):
+        subprocess.run(['pg_ctl', '-D', self.data, '-m', 'fast', '-w', 'stop'], stdout=subprocess.DEVNULL)
+        if not self.keep:
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def create_databases(dsn, scale):
+    admin = create_engine(dsn('postgres'), isolation_level='AUTOCOMMIT')
+    with admin.connect() as conn:
+        for db in ('aw_src', 'dw_adventure', 'dw_sqlalchemy'):
+            conn.execute(text(f"DROP DATABASE IF EXISTS {db}"))
+            conn.execute(text(f"CREATE DATABASE {db}"))
+    admin.dispose()
+
+    lines = SCALES[scale]
+    params = {'lines': lines, 'orders': max(lines // 3, 1), 'customers': max(lines // 50, 100),
+              'products': 500, 'employees': 300}
+    src = create_engine(dsn('aw_src'))
+    t0 = time.perf_counter()
+    run_sql(src, SOURCE_DDL)
+    run_sql(src, SOURCE_SEED, params)
+    seed_seconds = time.perf_counter() - t0
+    src.dispose()
+
+    run_sql(create_engine(dsn('dw_adventure')), sql_file('create_dw_schema.sql') + ';' + sql_file('create_dim_date.sql'))
+    run_sql(create_engine(dsn('dw_sqlalchemy')), DW_SQLALCHEMY_DDL)
+    return params, seed_seconds
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - t0, 4)
+
+
+def bench(dsn, scale):
+    params, seed_seconds = create_databases(dsn, scale)
+    result = {
+        'commit': git_commit(),
+        'scale': scale,
+        'source_rows': params,
+        'seed_seconds': round(seed_seconds, 2),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+    }
+
+    # etl_adventure_dw.py: engines trocados pelos do cluster temporário
+    adw = load_module('etl_adventure_dw', 'etl_adventure_dw.py')
+    adw.src_engine = adw.instrument_engine(get_engine(dsn('aw_src'), pool_size=adw.MAX_WORKERS))
+    adw.dst_engine = adw.instrument_engine(get_engine(dsn('dw_adventure'), pool_size=adw.MAX_WORKERS + 1))
+    result['etl_adventure_dw'] = {
+        'build_and_load_dims': timed(adw.build_and_load_dims),
+        'load_fact_sales': timed(adw.load_fact_sales),
+        'stages': adw.metrics.summary(),
+    }
+
+    # sqlalchemy.py (carregado com outro nome para não colidir com o pacote)
+    sa = load_module('etl_sqlalchemy', 'sqlalchemy.py')
+    sa.SRC_CONN, sa.DST_CONN = dsn('aw_src'), dsn('dw_sqlalchemy')
+    sa.METRICS_REPORT = os.devnull
+    result['sqlalchemy_etl'] = {
+        'etl': timed(sa.etl),
+        'stages': sa.metrics.summary(),
+    }
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--scale', choices=SCALES, default='10k')
+    ap.add_argument('--dsn-base', help='servidor existente, ex.: postgresql+psycopg2://postgres@localhost:5432')
+    ap.add_argument('--port', type=int, default=55432)
+    ap.add_argument('--keep', action='store_true', help='não apaga o cluster temporário')
+    ap.add_argument('--out', default=RESULTS_DIR)
+    opts = ap.parse_args(argv)
+
+    if opts.dsn_base:
+        result = bench(lambda db: f"{opts.dsn_base.rstrip('/')}/{db}", opts.scale)
+    else:
+        with TempPostgres(opts.port, opts.keep) as pg:
+            result = bench(pg.dsn, opts.scale)
+
+    os.makedirs(opts.out, exist_ok=True)
+    path = os.path.join(opts.out, f"{result['commit']}_{opts.scale}_{result['timestamp'].replace(':', '')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False, default=str)
+    print(json.dumps({k: v for k, v in result.items() if k not in ('etl_adventure_dw', 'sqlalchemy_etl')}, indent=2))
+    print(f"etl_adventure_dw: dims {result['etl_adventure_dw']['build_and_load_dims']}s, "
+          f"fatos {result['etl_adventure_dw']['load_fact_sales']}s")
+    print(f"sqlalchemy.py etl(): {result['sqlalchemy_etl']['etl']}s")
+    print(f"resultado: {path}")
+
+
+if __name__ == "__main__":
+    main()
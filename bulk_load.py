@@ -0,0 +1,134 @@
+# bulk_load.py
+"""
+Carga em massa para o DW via COPY FROM STDIN (psycopg2 copy_expert).
+
+Em vez de um INSERT por linha, cada DataFrame é serializado num buffer CSV em
+memória, copiado para uma tabela temporária de staging e aplicado no destino
+com um único INSERT ... SELECT (ON CONFLICT DO UPDATE / DO NOTHING).
+Tabelas temporárias não geram WAL, então o staging custa só o COPY.
+"""
+
+import io
+
+from sqlalchemy import text
+
+from metrics import count_round_trip
+
+# Marcador de NULL usado no CSV (não colide com string vazia)
+NULL = r'\N'
+
+
+def _dbapi_cursor(conn):
+    # conn: Connection do SQLAlchemy -> cursor psycopg2 da mesma transação
+    # (aceita também uma conexão psycopg2 direta, como nos scripts popula*)
+    return getattr(conn, 'connection', conn).cursor()
+
+
+def _csv_buffer(df):
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep=NULL)
+    buf.seek(0)
+    return buf
+
+
+def _keys(unique_key):
+    return [unique_key] if isinstance(unique_key, str) else list(unique_key)
+
+
+def copy_dataframe(conn, df, table):
+    """COPY direto do DataFrame para `table` (colunas = colunas do df)."""
+    if df.empty:
+        return 0
+    cols = ','.join(df.columns)
+    cur = _dbapi_cursor(conn)
+    try:
+        cur.copy_expert(
+            f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')",
+            _csv_buffer(df),
+        )
+        count_round_trip()
+    finally:
+        cur.close()
+    return len(df)
+
+
+def stage_dataframe(conn, df, table, stage=None):
+    """Cria uma tabela temporária com as colunas do df (tipos do destino) e faz COPY nela."""
+    stage = stage or f"_stg_{table.replace('.', '_')}"
+    cols = ','.join(df.columns)
+    conn.execute(text(f"DROP TABLE IF EXISTS {stage}"))
+    conn.execute(text(
+        f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA"
+    ))
+    copy_dataframe(conn, df, stage)
+    return stage
+
+
+def bulk_upsert(conn, table, df, unique_key, update=True, returning=None):
+    """
+    Upsert set-based: COPY -> staging -> INSERT ... ON CONFLICT.
+    update=True  -> DO UPDATE SET (mesma semântica do upsert linha a linha)
+    update=False -> DO NOTHING
+    Retorna o número de linhas enviadas, ou as linhas de RETURNING <returning>
+    quando informado (ex.: 'order_key, order_id').
+    """
+    if df.empty:
+        return [] if returning else 0
+    keys = _keys(unique_key)
+    # linhas repetidas na mesma chave: vale a última (como no loop por linha)
+    df = df.drop_duplicates(subset=keys, keep='last')
+    stage = stage_dataframe(conn, df, table)
+
+    cols = ','.join(df.columns)
+    conflict = ','.join(keys)
+    updates = ','.join(f"{c}=EXCLUDED.{c}" for c in df.columns if c not in keys)
+    if update and updates:
+        action = f"DO UPDATE SET {updates}"
+    else:
+        action = "DO NOTHING"
+    sql = f"""
+        INSERT INTO {table} ({cols})
+        SELECT {cols} FROM {stage}
+        ON CONFLICT ({conflict}) {action}
+    """
+    if returning:
+        return conn.execute(text(sql + f" RETURNING {returning}")).fetchall()
+    conn.execute(text(sql))
+    return len(df)
+
+
+def bulk_merge(conn, table, df, unique_key):
+    """
+    Merge set-based que só escreve o que mudou: COPY -> staging ->
+    INSERT ... ON CONFLICT DO UPDATE ... WHERE (colunas) IS DISTINCT FROM (novas).
+    Linhas idênticas não geram UPDATE (nem WAL / nova versão da tupla).
+    Retorna {'inserted', 'updated', 'unchanged'}.
+    """
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    if df.empty:
+        return counts
+    keys = _keys(unique_key)
+    df = df.drop_duplicates(subset=keys, keep='last')
+    stage = stage_dataframe(conn, df, table)
+
+    cols = ','.join(df.columns)
+    conflict = ','.join(keys)
+    attrs = [c for c in df.columns if c not in keys]
+    if attrs:
+        updates = ','.join(f"{c}=EXCLUDED.{c}" for c in attrs)
+        current = ','.join(f"t.{c}" for c in attrs)
+        new = ','.join(f"EXCLUDED.{c}" for c in attrs)
+        action = f"DO UPDATE SET {updates} WHERE ROW({current}) IS DISTINCT FROM ROW({new})"
+    else:
+        action = "DO NOTHING"
+    # xmax = 0 -> tupla recém-inserida; caso contrário veio do DO UPDATE
+    rows = conn.execute(text(f"""
+        INSERT INTO {table} AS t ({cols})
+        SELECT {cols} FROM {stage}
+        ON CONFLICT ({conflict}) {action}
+        RETURNING (xmax = 0) AS inserted
+    """)).fetchall()
+    counts['inserted'] = sum(1 for r in rows if r[0])
+    counts['updated'] = len(rows) - counts['inserted']
+    counts['unchanged'] = len(df) - len(rows)
+    return counts
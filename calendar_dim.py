@@ -0,0 +1,82 @@
+# calendar_dim.py
+"""
+Calendário vetorizado (dim_date) compartilhado por todos os loaders.
+
+Todos os atributos saem de aritmética inteira sobre datetime64 (NumPy), sem
+strftime por linha: date_key = year*10000 + month*100 + day. O calendário é
+carregado uma vez por ano e fica em cache; as linhas de fato recebem o
+date_key pelo mesmo cálculo inteiro.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+# nomes fixos (independem do locale, como o strftime('%B') no locale C)
+MONTH_NAMES = np.array(['', 'January', 'February', 'March', 'April', 'May', 'June', 'July',
+                        'August', 'September', 'October', 'November', 'December'], dtype=object)
+DAY_NAMES = np.array(['', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+                      'Saturday', 'Sunday'], dtype=object)
+
+
+def _days(dates):
+    return np.asarray(pd.to_datetime(dates), dtype='datetime64[D]')
+
+
+def _ymd(days):
+    months = days.astype('datetime64[M]')
+    year = months.astype('datetime64[Y]').astype(np.int32) + 1970
+    month = months.astype(np.int32) % 12 + 1
+    day = (days - months).astype(np.int32) + 1
+    return year, month, day
+
+
+def date_keys(dates):
+    """date_key (yyyymmdd) inteiro para uma sequência de datas."""
+    year, month, day = _ymd(_days(dates))
+    return year * 10000 + month * 100 + day
+
+
+def build_calendar(start, end):
+    """Todos os atributos de calendário de start a end (inclusive)."""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    year, month, day = _ymd(days)
+    # 1970-01-01 foi quinta-feira (ISO 4)
+    weekday = ((days.astype(np.int64) + 3) % 7 + 1).astype(np.int32)
+    return pd.DataFrame({
+        'date_key': year * 10000 + month * 100 + day,
+        'full_date': days.astype('datetime64[ns]'),
+        'year': year,
+        'quarter': (month - 1) // 3 + 1,
+        'month': month,
+        'month_name': MONTH_NAMES[month],
+        'day': day,
+        'weekday': weekday,                 # ISO: 1 = segunda ... 7 = domingo
+        'day_name': DAY_NAMES[weekday],
+        'is_weekend': weekday >= 6,
+    })
+
+
+class CalendarCache:
+    """
+    Garante que o calendário dos anos vistos esteja no DW, carregando cada ano
+    uma única vez por processo. `load` recebe o DataFrame de build_calendar e
+    grava na tabela de destino (renomeando colunas conforme o modelo).
+    """
+
+    def __init__(self, load):
+        self.load = load
+        self.years = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, dates):
+        years = np.unique(_ymd(_days(dates))[0]).tolist()
+        with self._lock:
+            missing = sorted(set(years) - self.years)
+            if not missing:
+                return
+            # todos os anos faltantes num só lote
+            frames = [build_calendar(f'{y}-01-01', f'{y}-12-31') for y in missing]
+            self.load(pd.concat(frames, ignore_index=True))
+            self.years.update(missing)
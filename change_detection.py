@@ -0,0 +1,74 @@
+# change_detection.py
+"""
+Detecção de mudanças nas dimensões por hash de conteúdo.
+
+No transform, cada linha recebe um hash (vetorizado, pd.util.hash_pandas_object)
+dos atributos rastreados, gravado na coluna row_hash da dimensão. Antes da
+carga, só seguem as chaves naturais novas ou cujo hash mudou; o volume
+carregado acompanha o volume de mudanças, não o tamanho da dimensão.
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+HASH_COL = 'row_hash'
+
+
+def read_dtypes(df):
+    """
+    Cópia rasa de `df` com os dtypes anuláveis (dtypes.py: boolean, Int32...) de
+    volta ao que o read_sql devolve (object com None, int64/float64): o hash não
+    muda com a compactação e os row_hash já gravados continuam valendo.
+    category já tem o mesmo hash dos valores.
+    """
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if not pd.api.types.is_extension_array_dtype(s.dtype) or s.dtype.kind not in 'biuf':
+            continue
+        if s.dtype.kind == 'b':
+            out[c] = s.astype(object).where(s.notna(), None) if s.hasnans else s.to_numpy(dtype=bool)
+        elif s.hasnans or s.dtype.kind == 'f':
+            out[c] = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            out[c] = s.to_numpy(dtype=np.int64)
+    return df.assign(**out) if out else df
+
+
+def row_hash(df, cols):
+    """Hash 64 bits por linha das colunas `cols` (como BIGINT com sinal), nos dtypes de leitura."""
+    hashed = pd.util.hash_pandas_object(read_dtypes(df[cols]), index=False)
+    return hashed.to_numpy(dtype=np.uint64).view(np.int64)
+
+
+def add_row_hash(df, unique_key, cols=None):
+    """Nova coluna row_hash com os atributos rastreados (padrão: tudo menos a chave)."""
+    keys = [unique_key] if isinstance(unique_key, str) else list(unique_key)
+    cols = cols or [c for c in df.columns if c not in keys and c != HASH_COL]
+    return df.assign(**{HASH_COL: row_hash(df, cols)})
+
+
+def ensure_hash_column(conn, table):
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {HASH_COL} BIGINT"))
+
+
+def changed_rows(conn, table, df, unique_key, where=None):
+    """
+    Filtra `df` (já com row_hash) para as chaves novas ou com hash diferente do DW.
+    `where` restringe as linhas comparadas (ex.: 'is_current' em dimensões SCD2).
+    """
+    if df.empty:
+        return df
+    # linhas sem hash (carga antiga) contam como alteradas
+    cond = f" AND ({where})" if where else ""
+    existing = pd.read_sql(text(
+        f"SELECT {unique_key}, {HASH_COL} AS _dw_hash FROM {table} WHERE {HASH_COL} IS NOT NULL{cond}"
+    ), conn)
+    if existing.empty:
+        return df
+    # lookup por posição (sem merge, que converteria o hash para float)
+    pos = pd.Index(existing[unique_key]).get_indexer(df[unique_key])
+    dw_hash = existing['_dw_hash'].to_numpy(dtype=np.int64)[pos]
+    changed = (pos == -1) | (dw_hash != df[HASH_COL].to_numpy())
+    return df[changed]
@@ -1,7 +1,7 @@
 -- dim_product
 CREATE TABLE dim_product (
   product_key SERIAL PRIMARY KEY,
-  product_id INTEGER UNIQUE,
+  product_id INTEGER NOT NULL,       -- SCD2: uma linha por versão
   product_name TEXT,
   product_number TEXT,
   category TEXT,
@@ -10,13 +10,20 @@ CREATE TABLE dim_product (
   size TEXT,
   standard_cost NUMERIC,
   list_price NUMERIC,
-  discontinued BOOLEAN
+  discontinued BOOLEAN,
+  row_hash BIGINT,            -- hash dos atributos (detecção de mudanças)
+  valid_from DATE NOT NULL DEFAULT '1900-01-01',
+  valid_to DATE,              -- exclusivo; NULL = versão vigente
+  is_current BOOLEAN NOT NULL DEFAULT true,
+  is_inferred BOOLEAN NOT NULL DEFAULT false  -- criado pela carga de fatos (inferred.py)
 );
+CREATE UNIQUE INDEX ux_dim_product_current ON dim_product (product_id) WHERE is_current;
+CREATE INDEX ix_dim_product_valid ON dim_product (product_id, valid_from);
 
 -- dim_customer
 CREATE TABLE dim_customer (
   customer_key SERIAL PRIMARY KEY,
-  customer_id INTEGER UNIQUE,
+  customer_id INTEGER NOT NULL,      -- SCD2: uma linha por versão
   first_name TEXT,
   last_name TEXT,
   email TEXT,
@@ -26,8 +33,15 @@ CREATE TABLE dim_customer (
   state TEXT,
   country TEXT,
   postal_code TEXT,
-  customer_type TEXT
+  customer_type TEXT,
+  row_hash BIGINT,
+  valid_from DATE NOT NULL DEFAULT '1900-01-01',
+  valid_to DATE,
+  is_current BOOLEAN NOT NULL DEFAULT true,
+  is_inferred BOOLEAN NOT NULL DEFAULT false
 );
+CREATE UNIQUE INDEX ux_dim_customer_current ON dim_customer (customer_id) WHERE is_current;
+CREATE INDEX ix_dim_customer_valid ON dim_customer (customer_id, valid_from);
 
 -- dim_salesperson
 CREATE TABLE dim_salesperson (
@@ -35,7 +49,9 @@ CREATE TABLE dim_salesperson (
   salesperson_id INTEGER UNIQUE,
   name TEXT,
   territory TEXT,
-  hire_date DATE
+  hire_date DATE,
+  row_hash BIGINT,
+  is_inferred BOOLEAN NOT NULL DEFAULT false
 );
 
 -- dim_territory
@@ -43,7 +59,9 @@ CREATE TABLE dim_territory (
   territory_key SERIAL PRIMARY KEY,
   territory_id INTEGER UNIQUE,
   name TEXT,
-  country_region_code TEXT
+  country_region_code TEXT,
+  row_hash BIGINT,
+  is_inferred BOOLEAN NOT NULL DEFAULT false
 );
 
 -- dim_order
@@ -72,11 +90,14 @@ CREATE TABLE dim_date (
 );
 
 
--- fact_sales
+-- fact_sales: particionada por mês em date_key (AAAAMMDD); as partições
+-- mensais (fact_sales_pAAAAMM) são criadas pelo loader (partitions.py).
+-- PK e chave natural incluem a chave de partição.
 CREATE TABLE fact_sales (
-  fact_sales_id BIGSERIAL PRIMARY KEY,
-  date_key INTEGER REFERENCES dim_date(date_key),
+  fact_sales_id BIGSERIAL,
+  date_key INTEGER NOT NULL REFERENCES dim_date(date_key),
   order_key INTEGER REFERENCES dim_order(order_key),
+  order_line_id INTEGER,             -- salesorderdetailid da origem
   product_key INTEGER REFERENCES dim_product(product_key),
   customer_key INTEGER REFERENCES dim_customer(customer_key),
   salesperson_key INTEGER REFERENCES dim_salesperson(salesperson_key),
@@ -86,5 +107,67 @@ CREATE TABLE fact_sales (
   unit_price_discount NUMERIC,
   line_total NUMERIC,
   standard_cost NUMERIC,
-  gross_margin NUMERIC
+  gross_margin NUMERIC,
+  PRIMARY KEY (fact_sales_id, date_key),
+  UNIQUE (order_key, order_line_id, date_key)  -- chave natural (upsert idempotente)
+) PARTITION BY RANGE (date_key);
+
+-- agregados para o Power BI, recalculados pelos dias/meses de cada carga (aggregates.py)
+CREATE TABLE agg_sales_day_category_territory (
+  date_key INTEGER NOT NULL,
+  category TEXT,
+  territory_key INTEGER,
+  line_count BIGINT NOT NULL,
+  order_count BIGINT NOT NULL,
+  order_qty BIGINT,
+  line_total NUMERIC,
+  gross_margin NUMERIC
+);
+CREATE INDEX ix_agg_sales_day_date ON agg_sales_day_category_territory (date_key);
+
+CREATE TABLE agg_sales_month_salesperson (
+  month INTEGER NOT NULL,            -- AAAAMM
+  salesperson_key INTEGER,
+  line_count BIGINT NOT NULL,
+  order_count BIGINT NOT NULL,
+  order_qty BIGINT,
+  line_total NUMERIC,
+  gross_margin NUMERIC
+);
+CREATE INDEX ix_agg_sales_month ON agg_sales_month_salesperson (month);
+
+-- estado do ETL: marca d'água por tabela de origem (carga incremental)
+CREATE SCHEMA IF NOT EXISTS dw;
+CREATE TABLE dw.etl_state (
+  source_table TEXT PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  last_modified TIMESTAMP NOT NULL DEFAULT '1900-01-01',
+  updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- índices/FKs removidos por uma carga em massa, até serem recriados (index_mgmt.py)
+CREATE TABLE dw.etl_pending_ddl (
+  table_name TEXT NOT NULL,
+  object_name TEXT NOT NULL,
+  kind TEXT NOT NULL,                -- 'index' ou 'fk'
+  definition TEXT NOT NULL,
+  dropped_at TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (table_name, object_name)
+);
+
+-- checkpoint por lote das cargas de fatos (batches.py): uma execução que cair
+-- no meio é retomada do primeiro lote não gravado
+CREATE TABLE dw.etl_batches (
+  job TEXT NOT NULL,
+  run_key TEXT NOT NULL,             -- marca d'água de partida da execução
+  batch_no INTEGER NOT NULL,
+  run_id TEXT NOT NULL,
+  first_id BIGINT NOT NULL,          -- faixa de salesorderdetailid do lote
+  last_id BIGINT NOT NULL,
+  max_modified TIMESTAMP,
+  row_count BIGINT NOT NULL,
+  date_keys INTEGER[],               -- dias alterados pelo lote (agregados)
+  completed BOOLEAN NOT NULL DEFAULT false,
+  committed_at TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (job, run_key, batch_no)
 );
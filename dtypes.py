@@ -0,0 +1,66 @@
+# dtypes.py
+"""
+Dtypes compactos por consulta de origem, aplicados na leitura.
+
+pd.read_sql devolve int64/float64/object: ids que cabem em 32 bits ocupam 8
+bytes e atributos repetidos (cor, categoria, país, cargo...) são um objeto
+Python por linha. Cada consulta tem aqui o seu esquema (base por nome de
+coluna + ajustes por consulta) e o frame é convertido logo após a leitura,
+chunk a chunk. Valores monetários ficam em float64 (o read_sql já converte
+NUMERIC para float; 15 dígitos significativos bastam para NUMERIC(19,4));
+float32 só onde a coluna admite (desconto). O row_hash das dimensões
+(change_detection.py) volta aos dtypes de leitura antes do hash, então a
+compactação não gera versões novas.
+
+Com copy-on-write, rename/fillna/seleções de colunas não copiam o frame
+inteiro: o transform trabalha sobre o mesmo buffer até alguém escrever.
+"""
+
+import pandas as pd
+
+# pandas 3: copy-on-write sempre ligado (a opção foi descontinuada)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# ids/chaves (Int32: aceita nulos, ex.: pedido sem vendedor)
+_IDS = ['productid', 'product_id', 'customerid', 'customer_id', 'salespersonid', 'salesperson_id',
+        'territoryid', 'territory_id', 'employee_id', 'salesorderid', 'order_id',
+        'salesorderdetailid', 'order_line_id', 'date_key', 'date_id']
+
+# atributos com poucos valores distintos
+_CATEGORIES = ['color', 'size', 'category', 'subcategory', 'brand', 'country', 'countryregioncode',
+               'country_region_code', 'region', 'stateprovince', 'state_province', 'city',
+               'territory_name', 'jobtitle', 'job_title']
+
+COLUMN_DTYPES = dict.fromkeys(_IDS, 'Int32')
+COLUMN_DTYPES.update(dict.fromkeys(_CATEGORIES, 'category'))
+COLUMN_DTYPES.update({
+    'status': 'Int8',
+    'orderqty': 'Int16',
+    'quantity': 'Int16',
+    'unitpricediscount': 'float32',
+    'discontinued': 'boolean',
+})
+
+# ajustes por consulta (nome = nome da etapa extract:<nome>)
+QUERY_DTYPES = {
+    # em sales_salesterritory, name é o nome do território (poucos valores)
+    'dim_territory': {'name': 'category'},
+}
+
+
+def dtypes_for(name, columns):
+    """Esquema compacto da consulta `name` restrito às colunas presentes."""
+    schema = dict(COLUMN_DTYPES)
+    schema.update(QUERY_DTYPES.get(name, {}))
+    return {c: schema[c] for c in columns if c in schema}
+
+
+def compact(df, name):
+    """Converte `df` para o esquema compacto da consulta (colunas já no dtype ficam como estão)."""
+    schema = {c: t for c, t in dtypes_for(name, df.columns).items() if str(df[c].dtype) != t}
+    return df.astype(schema) if schema else df
+
+
+def frame_mb(df):
+    return df.memory_usage(index=True, deep=True).sum() / 2**20
@@ -0,0 +1,69 @@
+# etl_state.py
+"""
+Estado persistido do ETL (dw.etl_state): marca d'água (high-water mark) por
+tabela de origem, usada na carga incremental dos fatos.
+
+Cada execução extrai só as linhas com id maior que o último carregado ou
+modificadas depois da última modifieddate vista.
+"""
+
+import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+STATE_DDL = """
+CREATE SCHEMA IF NOT EXISTS dw;
+CREATE TABLE IF NOT EXISTS dw.etl_state (
+  source_table TEXT PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  last_modified TIMESTAMP NOT NULL DEFAULT '1900-01-01',
+  updated_at TIMESTAMP NOT NULL DEFAULT now()
+)
+"""
+
+# Marca inicial (primeira execução = carga completa)
+START_ID = 0
+START_MODIFIED = datetime.datetime(1900, 1, 1)
+
+
+def ensure_state_table(conn):
+    for stmt in STATE_DDL.split(';'):
+        if stmt.strip():
+            conn.execute(text(stmt))
+
+
+def get_watermark(conn, source_table):
+    """Retorna (last_id, last_modified) da tabela de origem."""
+    row = conn.execute(
+        text("SELECT last_id, last_modified FROM dw.etl_state WHERE source_table = :t"),
+        {'t': source_table},
+    ).first()
+    if row is None:
+        return START_ID, START_MODIFIED
+    return row[0], row[1]
+
+
+def set_watermark(conn, source_table, last_id, last_modified):
+    """Avança a marca d'água (nunca retrocede)."""
+    conn.execute(text("""
+        INSERT INTO dw.etl_state (source_table, last_id, last_modified, updated_at)
+        VALUES (:t, :last_id, :last_modified, now())
+        ON CONFLICT (source_table) DO UPDATE SET
+          last_id = GREATEST(dw.etl_state.last_id, EXCLUDED.last_id),
+          last_modified = GREATEST(dw.etl_state.last_modified, EXCLUDED.last_modified),
+          updated_at = now()
+    """), {'t': source_table, 'last_id': int(last_id), 'last_modified': last_modified})
+
+
+class Watermark:
+    """Acumula o máximo de id / modifieddate visto nos chunks de uma execução."""
+
+    def __init__(self, last_id=START_ID, last_modified=START_MODIFIED):
+        self.last_id = last_id
+        self.last_modified = last_modified
+
+    def update(self, ids, modified):
+        if len(ids):
+            self.last_id = max(self.last_id, int(ids.max()))
+            self.last_modified = max(self.last_modified, pd.to_datetime(modified).max().to_pydatetime())
@@ -0,0 +1,20 @@
+# extract.py
+"""
+Extração em streaming: cursor do lado do servidor (named cursor do psycopg2,
+via stream_results=True) lido em chunks de tamanho fixo com pd.read_sql.
+A memória fica limitada ao tamanho do chunk, qualquer que seja o volume da fonte.
+"""
+
+import pandas as pd
+from sqlalchemy import text
+
+# Linhas por chunk na extração (pode ser sobrescrito por chamada)
+CHUNK_SIZE = 50000
+
+
+def read_sql_chunks(query, engine, chunksize=CHUNK_SIZE, params=None):
+    """Gera DataFrames de até `chunksize` linhas sem materializar o resultado inteiro."""
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(text(query), conn, params=params, chunksize=chunksize):
+            yield chunk
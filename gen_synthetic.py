@@ -0,0 +1,307 @@
+# gen_synthetic.py
+"""
+Gerador de dados sintéticos em volume para o DW (create_dw_schema.sql).
+
+Substitui os scripts popula*.py: em vez de chamar o Faker campo a campo e fazer
+um INSERT por linha, cada processo gera um pool de valores com o Faker uma vez,
+sorteia linhas com NumPy (RNG com semente) e grava via COPY. Cada processo
+recebe uma faixa disjunta de chaves, então as linhas são consistentes entre si
+(fact_sales referencia chaves que existem nas dimensões) e reprodutíveis.
+
+Uso:
+    python gen_synthetic.py --orders 1000000 --customers 100000 --workers 8
+    python gen_synthetic.py --tables dim_product --products 100
+"""
+
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from faker import Faker
+from sqlalchemy import text
+
+from bulk_load import bulk_upsert, copy_dataframe
+from calendar_dim import build_calendar, date_keys
+from db import dsn, get_engine
+from partitions import ensure_partitions
+
+DST_CONN = dsn('synthetic')
+
+TABLES = ['dim_territory', 'dim_product', 'dim_customer', 'dim_salesperson', 'dim_order', 'fact_sales']
+
+# Possíveis valores para campos categóricos
+CORES = ["Red", "Blue", "Green", "Black", "White", "Yellow", "Gray"]
+TAMANHOS = ["XS", "S", "M", "L", "XL", "XXL"]
+CATEGORIAS = [
+    ("Clothing", "Shirts"),
+    ("Clothing", "Pants"),
+    ("Clothing", "Shoes"),
+    ("Electronics", "Smartphones"),
+    ("Electronics", "Laptops"),
+    ("Accessories", "Watches"),
+    ("Accessories", "Bags")
+]
+TERRITORIOS = [
+    ("North", "US"), ("South", "US"), ("East", "US"), ("West", "US"),
+    ("Central", "US"), ("Northeast", "CA"), ("Southeast", "BR"), ("Midwest", "US")
+]
+TIPOS_CLIENTE = ["Regular", "VIP", "Premium"]
+METODOS_ENVIO = ["FedEx", "UPS", "DHL", "Correios", "USPS"]
+DESCONTOS = [0.0, 0.0, 0.0, 0.05, 0.10]
+
+
+def make_pools(seed, size):
+    """Valores do Faker gerados uma única vez; as linhas sorteiam índices neles."""
+    fake = Faker()
+    fake.seed_instance(seed)
+    gen = {
+        'word': lambda: fake.word().capitalize() + " " + fake.color_name(),
+        'first_name': fake.first_name,
+        'last_name': fake.last_name,
+        'phone': fake.phone_number,
+        'address': fake.street_address,
+        'city': fake.city,
+        'state': fake.state,
+        'country': fake.country,
+        'postal_code': fake.postcode,
+        'name': fake.name,
+    }
+    return {k: np.array([f() for _ in range(size)], dtype=object) for k, f in gen.items()}
+
+
+def _pick(rng, values, n):
+    values = np.asarray(values, dtype=object)
+    return values[rng.integers(0, len(values), n)]
+
+
+# Preço/custo determinísticos por product_id: qualquer processo calcula o mesmo
+# valor sem precisar da dim_product gerada por outro processo.
+def standard_cost(product_ids):
+    ids = np.asarray(product_ids, dtype=np.int64)
+    return np.round(20.0 + (ids * 2654435761 % 48000) / 100.0, 2)
+
+
+def list_price(product_ids):
+    ids = np.asarray(product_ids, dtype=np.int64)
+    return np.round(standard_cost(ids) * (1.1 + (ids * 40503 % 90) / 100.0), 2)
+
+
+def gen_territories():
+    ids = np.arange(1, len(TERRITORIOS) + 1)
+    return pd.DataFrame({
+        'territory_key': ids,
+        'territory_id': ids,
+        'name': [t[0] for t in TERRITORIOS],
+        'country_region_code': [t[1] for t in TERRITORIOS],
+    })
+
+
+def gen_products(rng, pools, start, stop, opts):
+    ids = np.arange(start, stop)
+    n = len(ids)
+    cat = rng.integers(0, len(CATEGORIAS), n)
+    return pd.DataFrame({
+        'product_key': ids,
+        'product_id': ids,
+        'product_name': _pick(rng, pools['word'], n),
+        'product_number': pd.Series(ids).map('P-{:05d}'.format).to_numpy(),
+        'category': np.array([c[0] for c in CATEGORIAS], dtype=object)[cat],
+        'subcategory': np.array([c[1] for c in CATEGORIAS], dtype=object)[cat],
+        'color': _pick(rng, CORES, n),
+        'size': _pick(rng, TAMANHOS, n),
+        'standard_cost': standard_cost(ids),
+        'list_price': list_price(ids),
+        'discontinued': rng.random(n) < 0.5,
+    })
+
+
+def gen_customers(rng, pools, start, stop, opts):
+    ids = np.arange(start, stop)
+    n = len(ids)
+    first = _pick(rng, pools['first_name'], n)
+    last = _pick(rng, pools['last_name'], n)
+    email = (pd.Series(first).str.lower() + '.' + pd.Series(last).str.lower()
+             + pd.Series(ids).astype(str) + '@example.com').to_numpy()
+    return pd.DataFrame({
+        'customer_key': ids,
+        'customer_id': ids,
+        'first_name': first,
+        'last_name': last,
+        'email': email,
+        'phone': _pick(rng, pools['phone'], n),
+        'address': _pick(rng, pools['address'], n),
+        'city': _pick(rng, pools['city'], n),
+        'state': _pick(rng, pools['state'], n),
+        'country': _pick(rng, pools['country'], n),
+        'postal_code': _pick(rng, pools['postal_code'], n),
+        'customer_type': _pick(rng, TIPOS_CLIENTE, n),
+    })
+
+
+def gen_salespersons(rng, pools, start, stop, opts):
+    ids = np.arange(start, stop)
+    n = len(ids)
+    hire = np.datetime64(opts.start, 'D') - rng.integers(0, 3650, n).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'salesperson_key': ids,
+        'salesperson_id': ids,
+        'name': _pick(rng, pools['name'], n),
+        'territory': _pick(rng, [t[0] for t in TERRITORIOS], n),
+        'hire_date': hire,
+    })
+
+
+def gen_orders(rng, pools, start, stop, opts):
+    ids = np.arange(start, stop)
+    n = len(ids)
+    first = np.datetime64(opts.start, 'D')
+    span = (np.datetime64(opts.end, 'D') - first).astype(int) + 1
+    order_date = first + rng.integers(0, span, n).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'order_key': ids,
+        'order_id': ids,
+        'order_date': order_date,
+        'due_date': order_date + rng.integers(3, 11, n).astype('timedelta64[D]'),
+        'ship_date': order_date + rng.integers(1, 8, n).astype('timedelta64[D]'),
+        'status': rng.integers(1, 6, n),
+        'online_order_flag': rng.random(n) < 0.5,
+        'ship_method': _pick(rng, METODOS_ENVIO, n),
+    })
+
+
+def gen_fact_sales(rng, orders, opts):
+    """Linhas de venda (1..max_lines por pedido) para um bloco de pedidos."""
+    n_orders = len(orders)
+    lines = rng.integers(1, opts.max_lines + 1, n_orders)
+    n = int(lines.sum())
+    # atributos do cabeçalho repetidos por linha
+    rep = lambda values: np.repeat(np.asarray(values), lines)
+    order_key = rep(orders['order_key'])
+    line_no = np.arange(n) - np.repeat(np.cumsum(lines) - lines, lines) + 1
+
+    product = rng.integers(1, opts.products + 1, n)
+    qty = rng.integers(1, 11, n)
+    price = list_price(product)
+    discount = _pick(rng, DESCONTOS, n).astype(np.float64)
+    cost = standard_cost(product)
+    line_total = np.round(price * qty * (1 - discount), 2)
+    return pd.DataFrame({
+        'date_key': rep(date_keys(orders['order_date'])),
+        'order_key': order_key,
+        'order_line_id': order_key * opts.max_lines + line_no,
+        'product_key': product,
+        'customer_key': rep(rng.integers(1, opts.customers + 1, n_orders)),
+        'salesperson_key': rep(rng.integers(1, opts.salespersons + 1, n_orders)),
+        'territory_key': rep(rng.integers(1, len(TERRITORIOS) + 1, n_orders)),
+        'order_qty': qty,
+        'unit_price': price,
+        'unit_price_discount': discount,
+        'line_total': line_total,
+        'standard_cost': cost,
+        'gross_margin': np.round(line_total - cost * qty, 2),
+    })
+
+
+GENERATORS = {
+    'dim_product': (gen_products, 'products'),
+    'dim_customer': (gen_customers, 'customers'),
+    'dim_salesperson': (gen_salespersons, 'salespersons'),
+    'dim_order': (gen_orders, 'orders'),
+}
+
+
+def key_ranges(total, parts):
+    """Divide 1..total em `parts` faixas disjuntas [início, fim)."""
+    bounds = np.linspace(1, total + 1, parts + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def worker(job):
+    """Gera e grava (via COPY) uma faixa de chaves de uma tabela."""
+    table, start, stop, opts = job
+    # semente distinta e estável por (tabela, faixa)
+    seed = [opts.seed, TABLES.index(table), start]
+    rng = np.random.default_rng(seed)
+    pools = make_pools(opts.seed + start, opts.pool_size)
+    gen, _ = GENERATORS[table]
+    # um engine por processo do Pool, reaproveitado entre as faixas
+    engine = get_engine(opts.dsn, pool_size=1)
+    rows = 0
+    with engine.begin() as conn:
+        for a in range(start, stop, opts.chunk):
+            df = gen(rng, pools, a, min(a + opts.chunk, stop), opts)
+            rows += copy_dataframe(conn, df, table)
+            if table == 'dim_order' and 'fact_sales' in opts.tables:
+                # os fatos do bloco de pedidos saem junto (mesma faixa de chaves)
+                rows += copy_dataframe(conn, gen_fact_sales(rng, df, opts), 'fact_sales')
+    return table, start, stop, rows
+
+
+def reset_sequences(conn, tables):
+    # as chaves substitutas foram geradas explicitamente: ajusta os SERIALs
+    keys = {'dim_territory': 'territory_key', 'dim_product': 'product_key', 'dim_customer': 'customer_key',
+            'dim_salesperson': 'salesperson_key', 'dim_order': 'order_key', 'fact_sales': 'fact_sales_id'}
+    for table in tables:
+        col = keys[table]
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{col}'), COALESCE(MAX({col}), 1)) FROM {table}"
+        ))
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--dsn', default=DST_CONN)
+    ap.add_argument('--tables', nargs='+', choices=TABLES, default=TABLES)
+    ap.add_argument('--products', type=int, default=1000)
+    ap.add_argument('--customers', type=int, default=100000)
+    ap.add_argument('--salespersons', type=int, default=100)
+    ap.add_argument('--orders', type=int, default=100000)
+    ap.add_argument('--max-lines', type=int, default=5, help='linhas de venda por pedido (máx.)')
+    ap.add_argument('--start', default='2015-01-01', help='primeira data de pedido')
+    ap.add_argument('--end', default='2024-12-31', help='última data de pedido')
+    ap.add_argument('--workers', type=int, default=4)
+    ap.add_argument('--chunk', type=int, default=100000, help='linhas por COPY')
+    ap.add_argument('--pool-size', type=int, default=1000, help='valores do Faker por campo')
+    ap.add_argument('--seed', type=int, default=42)
+    opts = ap.parse_args(argv)
+    if 'fact_sales' in opts.tables and 'dim_order' not in opts.tables:
+        # os fatos são gerados junto com os pedidos que referenciam
+        opts.tables.append('dim_order')
+    return opts
+
+
+def main(argv=None):
+    opts = parse_args(argv)
+    engine = get_engine(opts.dsn)
+
+    with engine.begin() as conn:
+        if 'fact_sales' in opts.tables:
+            # fact_sales.date_key -> dim_date: calendário do período inteiro
+            cal = build_calendar(opts.start, opts.end)
+            bulk_upsert(conn, 'dim_date', cal[['date_key', 'full_date', 'year', 'quarter', 'month',
+                                               'month_name', 'day', 'weekday', 'is_weekend']],
+                        'date_key', update=False)
+            # fact_sales é particionada por mês: partições do período antes do COPY
+            ensure_partitions(conn, 'fact_sales', cal['date_key'] // 100)
+        if 'dim_territory' in opts.tables:
+            copy_dataframe(conn, gen_territories(), 'dim_territory')
+
+    # dimensões primeiro (fact_sales referencia as chaves), depois pedidos + fatos
+    phases = [[t for t in ('dim_product', 'dim_customer', 'dim_salesperson') if t in opts.tables]]
+    if 'dim_order' in opts.tables:
+        phases.append(['dim_order'])
+    with Pool(opts.workers) as pool:
+        for phase in phases:
+            jobs = [(t, a, b, opts) for t in phase
+                    for a, b in key_ranges(getattr(opts, GENERATORS[t][1]), opts.workers)]
+            for table, a, b, rows in pool.imap_unordered(worker, jobs):
+                print(f"{table}: chaves {a}..{b - 1} -> {rows} linhas")
+
+    with engine.begin() as conn:
+        reset_sequences(conn, opts.tables)
+    print("Dados sintéticos gerados com sucesso!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# index_mgmt.py
+"""
+Modo de carga em massa: índices secundários e FKs fora do caminho do INSERT.
+
+Quando o lote é grande em relação à tabela (BULK_FRACTION das linhas estimadas
+em pg_class.reltuples), as definições dos índices secundários e das FKs são
+registradas em dw.etl_pending_ddl e os objetos removidos na mesma transação.
+A carga roda sem manutenção de índice/checagem de FK linha a linha; depois do
+commit os índices são recriados em paralelo (uma conexão por índice) e as FKs
+recriadas e validadas de uma vez. PK, UNIQUE e índices únicos ficam: o ON
+CONFLICT dos upserts e a linha corrente única das SCD2 dependem deles. Se o processo cair antes da recriação, restore_pending refaz o
+que ficou registrado.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+# modo em massa quando lote >= BULK_FRACTION * linhas da tabela
+BULK_FRACTION = 0.2
+REBUILD_WORKERS = 4
+MAINTENANCE_WORK_MEM = '512MB'
+
+PENDING_DDL = """
+CREATE SCHEMA IF NOT EXISTS dw;
+CREATE TABLE IF NOT EXISTS dw.etl_pending_ddl (
+  table_name TEXT NOT NULL,
+  object_name TEXT NOT NULL,
+  kind TEXT NOT NULL,
+  definition TEXT NOT NULL,
+  dropped_at TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (table_name, object_name)
+)
+"""
+
+
+def ensure_pending_table(conn):
+    for stmt in PENDING_DDL.split(';'):
+        if stmt.strip():
+            conn.execute(text(stmt))
+
+
+def estimated_rows(conn, table):
+    """
+    Linhas da tabela por pg_class.reltuples (particionada: soma das partições).
+    Tabela/partição nunca analisada (reltuples = -1) é contada com count(*),
+    em vez de passar por vazia e ligar o modo em massa a cada carga.
+    """
+    rels = conn.execute(text("""
+        SELECT c.oid::regclass::text AS name, c.reltuples
+        FROM pg_class c
+        WHERE c.relkind <> 'p'
+          AND (c.oid = CAST(:table AS regclass)
+               OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass)))
+    """), {'table': table}).fetchall()
+    total = 0
+    for rel in rels:
+        if rel.reltuples < 0:
+            total += conn.execute(text(f"SELECT count(*) FROM {rel.name}")).scalar()
+        else:
+            total += rel.reltuples
+    return total
+
+
+def is_partitioned(conn, table):
+    return conn.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = CAST(:table AS regclass)"
+    ), {'table': table}).scalar()
+
+
+def secondary_indexes(conn, table):
+    """
+    Índices que não são únicos nem sustentam PK/UNIQUE/EXCLUDE: [(nome, definição)].
+    Índices UNIQUE avulsos (ex.: ux_dim_product_current, parcial) também ficam.
+    """
+    return conn.execute(text("""
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = CAST(:table AS regclass)
+          AND NOT i.indisunique
+          AND NOT EXISTS (
+            SELECT 1 FROM pg_constraint k
+            WHERE k.conrelid = i.indrelid AND k.conindid = i.indexrelid AND k.contype IN ('p', 'u', 'x')
+          )
+    """), {'table': table}).fetchall()
+
+
+def foreign_keys(conn, table):
+    """FKs declaradas na tabela (não as clonadas nas partições): [(nome, definição)]."""
+    return conn.execute(text("""
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = CAST(:table AS regclass) AND contype = 'f' AND conparentid = 0
+    """), {'table': table}).fetchall()
+
+
+def _pending(engine, table=None):
+    sql = "SELECT table_name, object_name, kind, definition FROM dw.etl_pending_ddl"
+    with engine.connect() as conn:
+        if table:
+            return conn.execute(text(sql + " WHERE table_name = :table"), {'table': table}).fetchall()
+        return conn.execute(text(sql)).fetchall()
+
+
+def _create_index(engine, table, name, definition):
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL maintenance_work_mem = '{MAINTENANCE_WORK_MEM}'"))
+        # índice de tabela particionada vem como "ON ONLY": recria em todas as partições
+        conn.execute(text(definition.replace(' ON ONLY ', ' ON ')))
+        conn.execute(text("DELETE FROM dw.etl_pending_ddl WHERE table_name = :table AND object_name = :name"),
+                     {'table': table, 'name': name})
+
+
+def rebuild(engine, table=None, workers=REBUILD_WORKERS):
+    """Recria o que está em dw.etl_pending_ddl: índices em paralelo, depois as FKs. Retorna os tempos."""
+    pending = _pending(engine, table)
+    indexes = [p for p in pending if p.kind == 'index']
+    fks = [p for p in pending if p.kind == 'fk']
+    timings = {'rebuild_indexes': 0.0, 'validate_fks': 0.0}
+
+    t0 = time.perf_counter()
+    if indexes:
+        with ThreadPoolExecutor(min(workers, len(indexes))) as pool:
+            futures = [pool.submit(_create_index, engine, p.table_name, p.object_name, p.definition)
+                       for p in indexes]
+            for f in futures:
+                f.result()
+    timings['rebuild_indexes'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if fks:
+        with engine.begin() as conn:
+            for p in fks:
+                if is_partitioned(conn, p.table_name):
+                    # FK em tabela particionada não aceita NOT VALID: o ADD já valida
+                    conn.execute(text(f"ALTER TABLE {p.table_name} ADD CONSTRAINT {p.object_name} {p.definition}"))
+                else:
+                    conn.execute(text(f"ALTER TABLE {p.table_name} ADD CONSTRAINT {p.object_name} {p.definition} NOT VALID"))
+                    conn.execute(text(f"ALTER TABLE {p.table_name} VALIDATE CONSTRAINT {p.object_name}"))
+                conn.execute(text("DELETE FROM dw.etl_pending_ddl WHERE table_name = :table AND object_name = :name"),
+                             {'table': p.table_name, 'name': p.object_name})
+    timings['validate_fks'] = time.perf_counter() - t0
+    return timings
+
+
+def restore_pending(engine, workers=REBUILD_WORKERS):
+    """Refaz índices/FKs que ficaram removidos por uma carga interrompida."""
+    with engine.begin() as conn:
+        ensure_pending_table(conn)
+    pending = _pending(engine)
+    if pending:
+        print(f"restaurando {len(pending)} índices/FKs de uma carga em massa interrompida")
+        rebuild(engine, workers=workers)
+    return len(pending)
+
+
+def baseline_rows_per_sec(conn, stage):
+    """Vazão da última carga normal da etapa (dw.etl_run_log, execuções sem rebuild)."""
+    if conn.execute(text("SELECT to_regclass('dw.etl_run_log')")).scalar() is None:
+        return None
+    return conn.execute(text("""
+        SELECT l.rows_per_sec
+        FROM dw.etl_run_log l
+        WHERE l.stage = :stage AND l.rows_per_sec IS NOT NULL
+          AND NOT EXISTS (
+            SELECT 1 FROM dw.etl_run_log r WHERE r.run_id = l.run_id AND r.stage = :rebuild
+          )
+        ORDER BY l.logged_at DESC
+        LIMIT 1
+    """), {'stage': stage, 'rebuild': stage.replace('load:', 'rebuild:', 1)}).scalar()
+
+
+class BulkLoadMode:
+    """
+    prepare(conn, linhas_do_lote) decide o modo e, se em massa, remove índices/FKs
+    na transação de `conn`; finish(linhas, segundos_de_carga) recria tudo depois
+    do commit e imprime/retorna o tempo economizado estimado.
+    """
+
+    def __init__(self, engine, table, fraction=BULK_FRACTION, workers=REBUILD_WORKERS, metrics=None):
+        self.engine = engine
+        self.table = table
+        self.fraction = fraction
+        self.workers = workers
+        self.metrics = metrics
+        self.active = False
+        self.drop_seconds = 0.0
+
+    def prepare(self, conn, batch_rows):
+        existing = estimated_rows(conn, self.table)
+        if batch_rows <= 0 or batch_rows < self.fraction * existing:
+            return False
+        t0 = time.perf_counter()
+        indexes = secondary_indexes(conn, self.table)
+        fks = foreign_keys(conn, self.table)
+        if not indexes and not fks:
+            return False
+        rows = ([{'table': self.table, 'name': n, 'kind': 'index', 'definition': d} for n, d in indexes]
+                + [{'table': self.table, 'name': n, 'kind': 'fk', 'definition': d} for n, d in fks])
+        conn.execute(text("""
+            INSERT INTO dw.etl_pending_ddl (table_name, object_name, kind, definition)
+            VALUES (:table, :name, :kind, :definition)
+            ON CONFLICT (table_name, object_name) DO NOTHING
+        """), rows)
+        for name, _ in fks:
+            conn.execute(text(f"ALTER TABLE {self.table} DROP CONSTRAINT {name}"))
+        for name, _ in indexes:
+            conn.execute(text(f"DROP INDEX {name}"))
+        self.drop_seconds = time.perf_counter() - t0
+        self.active = True
+        print(f"{self.table}: carga em massa ({batch_rows} linhas, ~{existing:.0f} na tabela), "
+              f"{len(indexes)} índices e {len(fks)} FKs removidos até o fim da carga")
+        return True
+
+    def finish(self, rows=None, load_seconds=None):
+        if not self.active:
+            return None
+        self.active = False
+        if self.metrics:
+            with self.metrics.stage(f'rebuild:{self.table}'):
+                timings = rebuild(self.engine, self.table, self.workers)
+        else:
+            timings = rebuild(self.engine, self.table, self.workers)
+
+        report = {'table': self.table, 'rows': rows, 'drop_seconds': round(self.drop_seconds, 3),
+                  'load_seconds': load_seconds}
+        report.update({k: round(v, 3) for k, v in timings.items()})
+        with self.engine.connect() as conn:
+            baseline = baseline_rows_per_sec(conn, f'load:{self.table}')
+        report['baseline_rows_per_sec'] = baseline
+        report['saved_seconds'] = None
+        if baseline and rows and load_seconds is not None:
+            bulk_total = self.drop_seconds + load_seconds + sum(timings.values())
+            report['saved_seconds'] = round(rows / baseline - bulk_total, 3)
+
+        saved = (f"{report['saved_seconds']:.1f}s economizados (vs. {baseline:,.0f} linhas/s da última carga normal)"
+                 if report['saved_seconds'] is not None else "sem carga normal anterior para comparar")
+        print(f"{self.table}: índices recriados em {report['rebuild_indexes']:.1f}s, "
+              f"FKs validadas em {report['validate_fks']:.1f}s; {saved}")
+        return report
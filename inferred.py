@@ -0,0 +1,80 @@
+# inferred.py
+"""
+Membros inferidos (late-arriving) das dimensões.
+
+Quando um chunk de fatos traz uma chave natural que ainda não está na
+dimensão, o membro é criado antes do fato como linha provisória
+(is_inferred = true, atributos nulos): todas as chaves novas de um chunk
+entram num único INSERT ... RETURNING por dimensão e a chave substituta vai
+direto para o cache, então o fato nunca fica com FK nula. A próxima carga da
+dimensão preenche a linha: upsert comum nas dimensões tipo 1 e, nas SCD2,
+sobrescrita no lugar da versão inferida (load_scd2 com inferred_col), sem
+abrir versão nova; os fatos já carregados continuam apontando para ela.
+"""
+
+from sqlalchemy import text
+
+from key_cache import DIMENSIONS
+
+INFERRED_COL = 'is_inferred'
+
+# dimensão do cache -> coluna do chunk de fatos com a chave natural
+FACT_NATURAL_KEYS = {
+    'product': 'productid',
+    'customer': 'customerid',
+    'salesperson': 'salespersonid',
+    'territory': 'territoryid',
+}
+
+
+def ensure_inferred_columns(conn, dims=FACT_NATURAL_KEYS, dimensions=DIMENSIONS):
+    # ALTER TABLE trava a dimensão inteira mesmo com IF NOT EXISTS: só onde falta a coluna
+    for dim in dims:
+        table = dimensions[dim][0]
+        exists = conn.execute(text(
+            "SELECT 1 FROM pg_attribute WHERE attrelid = CAST(:table AS regclass) AND attname = :col AND NOT attisdropped"
+        ), {'table': table, 'col': INFERRED_COL}).first()
+        if not exists:
+            conn.execute(text(f"ALTER TABLE {table} "
+                              f"ADD COLUMN IF NOT EXISTS {INFERRED_COL} BOOLEAN NOT NULL DEFAULT false"))
+
+
+def insert_inferred(conn, dim, ids, scd2=False, dimensions=DIMENSIONS):
+    """
+    Cria os membros inferidos de `ids` numa instrução; devolve [(chave, id)] de
+    todos eles, inclusive os que outra carga criou no meio tempo.
+    """
+    table, key_col, id_col = dimensions[dim]
+    current = "AND d.is_current" if scd2 else ""
+    # SCD2: valid_from/is_current pelos defaults (versão única, vigente em qualquer data)
+    return conn.execute(text(f"""
+        WITH ins AS (
+            INSERT INTO {table} ({id_col}, {INFERRED_COL})
+            SELECT DISTINCT id, true FROM unnest(CAST(:ids AS integer[])) AS u(id)
+            ON CONFLICT DO NOTHING
+            RETURNING {key_col}, {id_col}
+        )
+        SELECT {key_col}, {id_col} FROM ins
+        UNION ALL
+        SELECT d.{key_col}, d.{id_col} FROM {table} d
+        WHERE d.{id_col} = ANY(CAST(:ids AS integer[])) {current}
+          AND d.{id_col} NOT IN (SELECT {id_col} FROM ins)
+    """), {'ids': ids}).fetchall()
+
+
+def add_inferred_members(engine, chunk, cache, natural_keys=FACT_NATURAL_KEYS):
+    """
+    Membros inferidos para as chaves do chunk ausentes do cache, numa transação
+    (só aberta se faltar alguma); retorna {dimensão: [(chave, id)] resolvidos}.
+    """
+    unknown = {dim: cache.unknown(dim, chunk[col]) for dim, col in natural_keys.items()}
+    unknown = {dim: ids for dim, ids in unknown.items() if ids}
+    if not unknown:
+        return {}
+    created = {}
+    with engine.begin() as conn:
+        for dim, ids in unknown.items():
+            rows = [tuple(r) for r in insert_inferred(conn, dim, ids, scd2=dim in cache.scd2)]
+            cache.add_inferred(dim, rows)
+            created[dim] = rows
+    return created
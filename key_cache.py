@@ -0,0 +1,202 @@
+# key_cache.py
+"""
+Cache em memória das chaves substitutas (natural -> surrogate) das dimensões.
+
+Cada dimensão é lida uma única vez para dois arrays NumPy ordenados pela chave
+natural; a resolução de um chunk de fatos é um searchsorted vetorizado, sem
+DataFrame.merge (que copia o frame inteiro a cada join). Chaves novas
+devolvidas pelos upserts (RETURNING) entram no cache sem reconsultar o DW.
+
+Dimensões SCD2 guardam também as versões (valid_from/valid_to) ordenadas por
+(chave natural, valid_from); a chave vigente na data de cada fato sai de um
+searchsorted sobre a chave composta, sem consulta por linha.
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# dimensão -> (tabela, coluna surrogate, coluna natural)
+DIMENSIONS = {
+    'product': ('dim_product', 'product_key', 'product_id'),
+    'customer': ('dim_customer', 'customer_key', 'customer_id'),
+    'salesperson': ('dim_salesperson', 'salesperson_key', 'salesperson_id'),
+    'territory': ('dim_territory', 'territory_key', 'territory_id'),
+    'order': ('dim_order', 'order_key', 'order_id'),
+}
+
+# deslocamento em dias para a chave composta (id << 32 | dia) ser positiva
+_DAY_OFFSET = 1 << 20
+_OPEN_END = np.iinfo(np.int64).max
+
+
+def _epoch_days(dates):
+    return np.asarray(pd.to_datetime(dates), dtype='datetime64[D]').astype(np.int64)
+
+
+def _version_order(comp, end):
+    # empate na chave composta (versão de duração zero + sucessora no mesmo dia):
+    # a de fim maior fica por último e é a que o searchsorted encontra
+    return np.lexsort((end, comp))
+
+
+class SurrogateKeyCache:
+
+    def __init__(self, dimensions=DIMENSIONS, scd2=()):
+        self.dimensions = dimensions
+        self.scd2 = set(scd2)
+        self._ids = {}
+        self._keys = {}
+        self._versions = {}
+        self.hits = dict.fromkeys(dimensions, 0)
+        self.misses = dict.fromkeys(dimensions, 0)
+        # chaves naturais sem membro na dimensão (late-arriving)
+        self.missing = {dim: set() for dim in dimensions}
+
+    def load(self, conn, dims=None):
+        """Lê o mapa natural->surrogate de cada dimensão (uma consulta por dimensão)."""
+        for dim in dims or self.dimensions:
+            if dim in self.scd2:
+                self.load_versions(conn, dim)
+                continue
+            table, key_col, id_col = self.dimensions[dim]
+            rows = conn.execute(text(
+                f"SELECT {id_col}, {key_col} FROM {table} WHERE {id_col} IS NOT NULL"
+            )).fetchall()
+            self._ids[dim] = np.empty(0, dtype=np.int64)
+            self._keys[dim] = np.empty(0, dtype=np.int64)
+            if rows:
+                ids, keys = zip(*rows)
+                self.add(dim, ids, keys)
+
+    def load_versions(self, conn, dim):
+        """Dimensão SCD2: todas as versões + mapa das linhas correntes."""
+        table, key_col, id_col = self.dimensions[dim]
+        df = pd.read_sql(text(
+            f"SELECT {id_col} AS id, {key_col} AS key, valid_from, valid_to, is_current "
+            f"FROM {table} WHERE {id_col} IS NOT NULL"
+        ), conn)
+        ids = df['id'].to_numpy(dtype=np.int64)
+        start = _epoch_days(df['valid_from'])
+        end = np.where(df['valid_to'].isna(), _OPEN_END,
+                       _epoch_days(df['valid_to'].fillna(df['valid_from'])))
+        comp = (ids << 32) | (start + _DAY_OFFSET)
+        order = _version_order(comp, end)
+        self._versions[dim] = (comp[order], ids[order], end[order],
+                               df['key'].to_numpy(dtype=np.int64)[order])
+        current = df['is_current'].to_numpy(dtype=bool)
+        self._ids[dim] = np.empty(0, dtype=np.int64)
+        self._keys[dim] = np.empty(0, dtype=np.int64)
+        self.add(dim, ids[current], df['key'].to_numpy(dtype=np.int64)[current])
+
+    def add(self, dim, ids, keys):
+        """Inclui/atualiza pares (id natural, chave) — ex.: linhas de um RETURNING."""
+        ids = np.asarray(ids, dtype=np.int64)
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        all_ids = np.concatenate([self._ids.get(dim, ids[:0]), ids])
+        all_keys = np.concatenate([self._keys.get(dim, keys[:0]), keys])
+        # em ids repetidos vale o último (a chave mais recente)
+        order = np.argsort(all_ids, kind='stable')
+        all_ids, all_keys = all_ids[order], all_keys[order]
+        last = np.r_[all_ids[1:] != all_ids[:-1], True]
+        self._ids[dim] = all_ids[last]
+        self._keys[dim] = all_keys[last]
+        self.missing[dim].difference_update(ids.tolist())
+
+    def add_rows(self, dim, rows):
+        """Atalho para linhas (key, id) devolvidas por RETURNING key, id."""
+        if rows:
+            keys, ids = zip(*rows)
+            self.add(dim, ids, keys)
+
+    def unknown(self, dim, natural_ids):
+        """Ids naturais (não nulos, distintos) sem nenhum membro corrente na dimensão."""
+        values = pd.to_numeric(pd.Series(natural_ids), errors='coerce').dropna()
+        wanted = np.unique(values.to_numpy(dtype=np.int64))
+        found, _ = self._lookup(dim, wanted)
+        return wanted[~found].tolist()
+
+    def add_inferred(self, dim, rows):
+        """
+        Membros inferidos (RETURNING key, id). Em dimensões SCD2 entram também
+        como versão única, vigente em qualquer data (valid_from 1900-01-01, sem fim).
+        """
+        if not rows:
+            return
+        keys, ids = zip(*rows)
+        if dim in self._versions:
+            ids_a = np.asarray(ids, dtype=np.int64)
+            start = np.full(len(ids_a), np.datetime64('1900-01-01', 'D').astype(np.int64))
+            comp, v_ids, end, v_keys = self._versions[dim]
+            comp = np.concatenate([comp, (ids_a << 32) | (start + _DAY_OFFSET)])
+            end = np.concatenate([end, np.full(len(ids_a), _OPEN_END)])
+            order = _version_order(comp, end)
+            self._versions[dim] = (comp[order], np.concatenate([v_ids, ids_a])[order], end[order],
+                                   np.concatenate([v_keys, np.asarray(keys, dtype=np.int64)])[order])
+        self.add(dim, ids, keys)
+
+    def resolve(self, dim, natural_ids, dates=None):
+        """
+        Converte uma Series de ids naturais em chaves substitutas (Int64, <NA> se ausente).
+        Em dimensões SCD2, `dates` escolhe a versão vigente na data de cada fato.
+        """
+        values = pd.to_numeric(pd.Series(natural_ids), errors='coerce')
+        present = values.notna().to_numpy()
+        wanted = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        wanted = np.where(present, wanted, 0).astype(np.int64)
+
+        if dates is not None and dim in self._versions:
+            found, keys = self._lookup_asof(dim, wanted, _epoch_days(dates))
+        else:
+            found, keys = self._lookup(dim, wanted)
+        found &= present
+
+        self.hits[dim] += int(found.sum())
+        missed = present & ~found
+        self.misses[dim] += int(missed.sum())
+        if missed.any():
+            self.missing[dim].update(np.unique(wanted[missed]).tolist())
+        return pd.Series(pd.arrays.IntegerArray(keys, ~found), index=values.index)
+
+    def _lookup(self, dim, wanted):
+        ids = self._ids.get(dim)
+        if ids is None or len(ids) == 0:
+            return np.zeros(len(wanted), dtype=bool), np.zeros(len(wanted), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(ids, wanted), len(ids) - 1)
+        return ids[pos] == wanted, self._keys[dim][pos]
+
+    def _lookup_asof(self, dim, wanted, days):
+        comp, ids, end, keys = self._versions[dim]
+        if len(comp) == 0:
+            return np.zeros(len(wanted), dtype=bool), np.zeros(len(wanted), dtype=np.int64)
+        # última versão com valid_from <= data do fato, da mesma chave natural
+        pos = np.searchsorted(comp, (wanted << 32) | (days + _DAY_OFFSET), side='right') - 1
+        ok = pos >= 0
+        pos = np.maximum(pos, 0)
+        found = ok & (ids[pos] == wanted) & (days < end[pos])
+        return found, keys[pos]
+
+    def take_counters(self):
+        """Acertos/faltas desde a última chamada, zerando (transform em outro processo)."""
+        counters = (self.hits, self.misses, self.missing)
+        self.hits = dict.fromkeys(self.dimensions, 0)
+        self.misses = dict.fromkeys(self.dimensions, 0)
+        self.missing = {dim: set() for dim in self.dimensions}
+        return counters
+
+    def merge_counters(self, counters):
+        """Soma os contadores devolvidos por take_counters de outro processo."""
+        hits, misses, missing = counters
+        for dim in self.dimensions:
+            self.hits[dim] += hits[dim]
+            self.misses[dim] += misses[dim]
+            self.missing[dim].update(missing[dim])
+
+    def report(self):
+        """Resumo de acertos/faltas por dimensão (faltas = membros que chegaram atrasados)."""
+        return {
+            dim: {'hits': self.hits[dim], 'misses': self.misses[dim], 'missing_ids': len(self.missing[dim])}
+            for dim in self.dimensions
+        }
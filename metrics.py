@@ -0,0 +1,271 @@
+# metrics.py
+"""
+Instrumentação das execuções do ETL por etapa (extract / transform / load).
+
+Cada etapa é medida com o context manager `stage` (ou o decorator `timed`, ou
+`iter_stage` para extrações em streaming): tempo de parede, linhas de entrada
+e saída, linhas/s, pico de RSS do processo e número de idas ao banco (cada
+execute do SQLAlchemy + cada COPY). RSS atual antes/depois de cada etapa e,
+nas etapas dtypes:<consulta>, o tamanho do frame antes/depois da conversão
+para dtypes compactos (dtypes.py). Ao final, o relatório vai para um JSON e,
+opcionalmente, para a tabela dw.etl_run_log.
+
+Perfil opcional de uma etapa escolhida:
+    ETL_PROFILE_STAGE=load:fact_sales     -> cProfile (.prof ao lado do JSON)
+    ETL_TRACEMALLOC_STAGE=transform:fact  -> top alocações (tracemalloc) no relatório
+"""
+
+import cProfile
+import datetime
+import functools
+import json
+import os
+import pstats
+import resource
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import event, text
+
+from db import execute_values
+from dtypes import compact, frame_mb
+
+_local = threading.local()
+
+RUN_LOG_DDL = """
+CREATE SCHEMA IF NOT EXISTS dw;
+CREATE TABLE IF NOT EXISTS dw.etl_run_log (
+  run_id TEXT NOT NULL,
+  job TEXT NOT NULL,
+  stage TEXT NOT NULL,
+  calls INTEGER NOT NULL,
+  seconds DOUBLE PRECISION NOT NULL,
+  rows_in BIGINT,
+  rows_out BIGINT,
+  rows_per_sec DOUBLE PRECISION,
+  round_trips BIGINT,
+  peak_rss_mb DOUBLE PRECISION,
+  logged_at TIMESTAMP NOT NULL DEFAULT now()
+)
+"""
+
+
+def peak_rss_mb():
+    # ru_maxrss: KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def current_rss_mb():
+    # RSS atual (não o pico): /proc/self/statm no Linux
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def count_round_trip(n=1):
+    """Conta idas ao banco nas etapas abertas na thread atual (inclusive as externas)."""
+    for st in getattr(_local, 'stack', ()):
+        st.round_trips += n
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    count_round_trip()
+
+
+def instrument_engine(engine):
+    """Conta cada execute do engine como uma ida ao banco."""
+    if not event.contains(engine, 'before_cursor_execute', _before_execute):
+        event.listen(engine, 'before_cursor_execute', _before_execute)
+    return engine
+
+
+class Stage:
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.round_trips = 0
+        self.seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self.rss_before_mb = 0.0
+        self.rss_after_mb = 0.0
+        # tamanho do frame antes/depois dos dtypes compactos (etapas dtypes:*)
+        self.frame_mb_raw = None
+        self.frame_mb = None
+        self.top_allocations = None
+
+    def as_dict(self):
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        return {
+            'stage': self.name,
+            'seconds': round(self.seconds, 4),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_per_sec': round(rows / self.seconds, 1) if rows and self.seconds else None,
+            'round_trips': self.round_trips,
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'rss_before_mb': round(self.rss_before_mb, 1),
+            'rss_after_mb': round(self.rss_after_mb, 1),
+            'frame_mb_raw': None if self.frame_mb_raw is None else round(self.frame_mb_raw, 2),
+            'frame_mb': None if self.frame_mb is None else round(self.frame_mb, 2),
+            'top_allocations': self.top_allocations,
+        }
+
+
+class RunMetrics:
+
+    def __init__(self, job, profile_stage=None, tracemalloc_stage=None):
+        self.job = job
+        self.run_id = uuid.uuid4().hex
+        self.started_at = datetime.datetime.now()
+        self._t0 = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+        self.profile_stage = profile_stage or os.environ.get('ETL_PROFILE_STAGE')
+        self.tracemalloc_stage = tracemalloc_stage or os.environ.get('ETL_TRACEMALLOC_STAGE')
+        self.profiles = {}
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Mede uma etapa; defina `st.rows_out` dentro do bloco."""
+        st = Stage(name, rows_in)
+        stack = _local.__dict__.setdefault('stack', [])
+        stack.append(st)
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        tracing = name == self.tracemalloc_stage and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        st.rss_before_mb = current_rss_mb()
+        t0 = time.perf_counter()
+        try:
+            yield st
+        finally:
+            st.seconds = time.perf_counter() - t0
+            if profiler:
+                profiler.disable()
+                with self._lock:
+                    self.profiles.setdefault(name, []).append(profiler)
+            if tracing:
+                snap = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                st.top_allocations = [str(s) for s in snap.statistics('lineno')[:10]]
+            st.peak_rss_mb = peak_rss_mb()
+            st.rss_after_mb = current_rss_mb()
+            stack.pop()
+            with self._lock:
+                self.stages.append(st)
+
+    def timed(self, name):
+        """Decorator: mede a função; rows_out = len(retorno) quando houver."""
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name) as st:
+                    result = fn(*args, **kwargs)
+                    if hasattr(result, '__len__'):
+                        st.rows_out = len(result)
+                    return result
+            return wrapper
+        return deco
+
+    def iter_stage(self, name, iterable):
+        """Mede só o tempo de buscar cada item de um iterador (ex.: chunks em streaming)."""
+        it = iter(iterable)
+        while True:
+            with self.stage(name) as st:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    st.rows_out = 0
+                    return
+                st.rows_out = len(item) if hasattr(item, '__len__') else None
+            yield item
+
+    def compact(self, df, name):
+        """Dtypes compactos da consulta `name` logo após a leitura (etapa dtypes:<name>)."""
+        with self.stage(f'dtypes:{name}', rows_in=len(df)) as st:
+            st.frame_mb_raw = frame_mb(df)
+            df = compact(df, name)
+            st.frame_mb = frame_mb(df)
+            st.rows_out = len(df)
+        return df
+
+    def summary(self):
+        """Etapas agregadas por nome (chunks repetidos somam)."""
+        agg = {}
+        with self._lock:
+            stages = list(self.stages)
+        for st in stages:
+            a = agg.setdefault(st.name, {'stage': st.name, 'calls': 0, 'seconds': 0.0, 'rows_in': None,
+                                         'rows_out': None, 'round_trips': 0, 'peak_rss_mb': 0.0,
+                                         'rss_before_mb': st.rss_before_mb, 'rss_after_mb': 0.0,
+                                         'frame_mb_raw': None, 'frame_mb': None})
+            a['calls'] += 1
+            a['seconds'] += st.seconds
+            a['round_trips'] += st.round_trips
+            a['peak_rss_mb'] = max(a['peak_rss_mb'], st.peak_rss_mb)
+            a['rss_after_mb'] = max(a['rss_after_mb'], st.rss_after_mb)
+            for k in ('rows_in', 'rows_out', 'frame_mb_raw', 'frame_mb'):
+                v = getattr(st, k)
+                if v is not None:
+                    a[k] = (a[k] or 0) + v
+        for a in agg.values():
+            rows = a['rows_out'] if a['rows_out'] is not None else a['rows_in']
+            a['seconds'] = round(a['seconds'], 4)
+            a['rows_per_sec'] = round(rows / a['seconds'], 1) if rows and a['seconds'] else None
+            for k in ('peak_rss_mb', 'rss_before_mb', 'rss_after_mb'):
+                a[k] = round(a[k], 1)
+            for k in ('frame_mb_raw', 'frame_mb'):
+                if a[k] is not None:
+                    a[k] = round(a[k], 2)
+        return list(agg.values())
+
+    def report(self):
+        return {
+            'run_id': self.run_id,
+            'job': self.job,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - self._t0, 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'summary': self.summary(),
+            'stages': [st.as_dict() for st in self.stages],
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        base = os.path.splitext(path)[0]
+        for name, profilers in self.profiles.items():
+            # uma chamada por chunk: junta tudo num único .prof
+            stats = pstats.Stats(profilers[0])
+            for prof in profilers[1:]:
+                stats.add(prof)
+            stats.dump_stats(f"{base}.{name.replace(':', '_')}.prof")
+        return path
+
+    def write_run_log(self, conn):
+        """Grava o resumo por etapa em dw.etl_run_log (uma linha por etapa)."""
+        for stmt in RUN_LOG_DDL.split(';'):
+            if stmt.strip():
+                conn.execute(text(stmt))
+        cols = ('stage', 'calls', 'seconds', 'rows_in', 'rows_out', 'rows_per_sec', 'round_trips', 'peak_rss_mb')
+        rows = [(self.run_id, self.job) + tuple(a[c] for c in cols) for a in self.summary()]
+        # todas as etapas num único INSERT multi-VALUES
+        execute_values(conn, f"INSERT INTO dw.etl_run_log (run_id, job, {', '.join(cols)}) VALUES %s", rows)
+
+    def print_summary(self):
+        for a in self.summary():
+            rate = f"{a['rows_per_sec']:,.0f} linhas/s" if a['rows_per_sec'] else '-'
+            mem = (f"  frame {a['frame_mb_raw']:.1f} -> {a['frame_mb']:.1f} MB"
+                   if a['frame_mb'] is not None else '')
+            print(f"  {a['stage']:28s} {a['calls']:5d}x {a['seconds']:9.2f}s  {rate:>18s}"
+                  f"  {a['round_trips']:7d} idas ao banco  RSS {a['rss_before_mb']:.0f} -> {a['rss_after_mb']:.0f} MB"
+                  f" (pico {a['peak_rss_mb']:.0f}){mem}")
@@ -0,0 +1,120 @@
+# parallel_transform.py
+"""
+Transform de chunks de fatos em vários processos.
+
+O chunk extraído é dividido em fatias por faixa de salesorderid (as linhas de
+um pedido ficam na mesma fatia) e cada fatia é transformada num processo do
+pool; o resultado é remontado na ordem original das linhas, então a saída é
+a mesma do transform num processo só. O estado do transform (mapas de
+chaves das dimensões, custo do produto...) vai para cada processo uma única
+vez, no initializer, e não a cada chunk. Se o estado tiver take_counters /
+merge_counters (SurrogateKeyCache), os contadores de acertos/faltas dos
+processos voltam somados para o do processo principal. Mudanças no estado
+durante a carga (ex.: membros inferidos no cache) são repassadas com
+sync(método, *args): vão junto com as fatias seguintes e cada processo
+aplica as que ainda não viu, sem recriar o pool.
+
+Requisitos do transform: função de módulo fn(fatia, estado) que devolve uma
+linha por linha de entrada, com o mesmo índice.
+"""
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# processos de transform
+TRANSFORM_WORKERS = os.cpu_count() or 1
+# fatias menores que isso não compensam o envio ao processo
+MIN_SHARD_ROWS = 20000
+
+_fn = None
+_state = None
+# última atualização de sync() aplicada neste processo
+_synced = 0
+
+
+def _init_worker(fn, state):
+    global _fn, _state
+    _fn, _state = fn, state
+
+
+def _transform_shard(shard, updates=()):
+    global _synced
+    for seq, method, args in updates:
+        if seq > _synced:
+            getattr(_state, method)(*args)
+            _synced = seq
+    out = _fn(shard, _state)
+    counters = _state.take_counters() if hasattr(_state, 'take_counters') else None
+    return out, counters
+
+
+def shard_bounds(keys, shards):
+    """Limites de faixa da chave para `shards` fatias de tamanho parecido (pedidos inteiros)."""
+    values = np.sort(pd.unique(np.asarray(keys)))
+    if len(values) == 0 or shards <= 1:
+        return np.empty(0, dtype=values.dtype)
+    cuts = np.linspace(0, len(values), shards + 1)[1:-1].astype(int)
+    return np.unique(values[cuts])
+
+
+class ParallelTransform:
+    """
+    with ParallelTransform(fn, estado, workers) as transform:
+        df_out = transform(chunk)   # mesmo resultado de fn(chunk, estado)
+    """
+
+    def __init__(self, fn, state, workers=TRANSFORM_WORKERS, key='salesorderid', min_shard_rows=MIN_SHARD_ROWS):
+        self.fn = fn
+        self.state = state
+        self.workers = workers
+        self.key = key
+        self.min_shard_rows = min_shard_rows
+        self._pool = None
+        self._updates = []
+
+    def __enter__(self):
+        if self.workers > 1:
+            # spawn como em partitions.py: nada de fork com as threads do DAG rodando
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker, initargs=(self.fn, self.state))
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        return False
+
+    def sync(self, method, *args):
+        """
+        Repete nos processos state.method(*args), já aplicado ao estado daqui
+        (ex.: sync('add_inferred', dim, linhas)); sem pool, nada a fazer.
+        """
+        if self._pool is not None:
+            self._updates.append((len(self._updates) + 1, method, args))
+
+    def __call__(self, chunk):
+        shards = min(self.workers, math.ceil(len(chunk) / self.min_shard_rows))
+        if self._pool is None or shards <= 1:
+            return self.fn(chunk, self.state)
+
+        keys = chunk[self.key].to_numpy(dtype=np.int64, na_value=-1)
+        shard_of = np.searchsorted(shard_bounds(keys, shards), keys, side='right')
+        positions = [np.flatnonzero(shard_of == i) for i in range(shard_of.max() + 1)]
+        positions = [p for p in positions if len(p)]
+        futures = [self._pool.submit(_transform_shard, chunk.iloc[p], self._updates) for p in positions]
+
+        parts = []
+        for fut in futures:  # na ordem das fatias: saída determinística
+            out, counters = fut.result()
+            if counters is not None:
+                self.state.merge_counters(counters)
+            parts.append(out)
+        # de volta à ordem original das linhas
+        order = np.argsort(np.concatenate(positions), kind='stable')
+        return pd.concat(parts).iloc[order]
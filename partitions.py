@@ -0,0 +1,277 @@
+# partitions.py
+"""
+Particionamento mensal de fact_sales por RANGE(date_key).
+
+date_key é AAAAMMDD, então o mês AAAAMM cobre [AAAAMM01, AAAAMM01 do mês
+seguinte). O loader cria as partições que faltam, separa cada chunk por mês e
+grava direto na partição (sem o roteamento de tuplas pela tabela pai);
+partições diferentes são carregadas em paralelo, cada uma num processo com a
+sua própria conexão. Recarregar um mês é montar uma tabela nova e trocá-la
+pela partição antiga com DETACH/ATTACH, sem DELETE.
+
+Como date_key faz parte da chave única, uma linha cuja data mudou de mês na
+origem seria gravada de novo na partição nova. As linhas do chunk que podem
+já estar no DW (ids abaixo da marca d'água, reextraídas por modifieddate)
+passam por delete_moved, que remove as versões antigas (mesma chave natural,
+outro date_key) na mesma transação do upsert da partição de destino; linhas
+novas não consultam as outras partições.
+
+Com checkpoint por lote (batches.py), o paralelismo passa a ser entre chunks:
+submit() manda o chunk inteiro para um processo, que numa única transação
+remove as linhas que mudaram de mês, grava cada mês na sua partição e
+registra o lote no ledger (com os date_key removidos). Um chunk nunca fica
+meio gravado nem gravado sem registro.
+"""
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import text
+
+from bulk_load import bulk_upsert, copy_dataframe, stage_dataframe
+from db import get_engine
+
+# processos de carga (uma partição por vez em cada um)
+PARTITION_WORKERS = 4
+
+
+def month_bounds(month):
+    """Limites [lo, hi) de date_key do mês AAAAMM."""
+    year, mon = divmod(int(month), 100)
+    following = (year + 1) * 100 + 1 if mon == 12 else int(month) + 1
+    return int(month) * 100 + 1, following * 100 + 1
+
+
+def partition_name(table, month):
+    return f"{table}_p{int(month)}"
+
+
+def existing_partitions(conn, table):
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:table AS regclass)
+    """), {'table': table}).fetchall()
+    return {r[0] for r in rows}
+
+
+def ensure_partitions(conn, table, months):
+    """Cria as partições mensais que ainda não existem; retorna as criadas."""
+    existing = existing_partitions(conn, table)
+    created = []
+    for month in sorted({int(m) for m in months}):
+        name = partition_name(table, month)
+        if name in existing:
+            continue
+        lo, hi = month_bounds(month)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM ({lo}) TO ({hi})"
+        ))
+        created.append(name)
+    return created
+
+
+def split_by_month(df, col='date_key'):
+    """{AAAAMM: linhas do mês} de um chunk já transformado."""
+    months = (df[col] // 100).astype('int64').to_numpy()
+    return {int(m): part for m, part in df.groupby(months, sort=True)}
+
+
+def delete_moved(conn, table, df, natural_key, col='date_key'):
+    """
+    Remove as linhas já gravadas com a chave natural de `df` e outro `col`
+    (ex.: pedido cuja data mudou de mês); retorna os valores de `col` removidos.
+    """
+    if df is None or df.empty:
+        return set()
+    keys = list(natural_key)
+    stage = stage_dataframe(conn, df[keys + [col]].drop_duplicates(subset=keys, keep='last'),
+                            table, f"_stg_{table.replace('.', '_')}_moved")
+    match = ' AND '.join(f"t.{k} = s.{k}" for k in keys)
+    rows = conn.execute(text(f"""
+        DELETE FROM {table} t
+        USING {stage} s
+        WHERE {match} AND t.{col} <> s.{col}
+        RETURNING t.{col}
+    """)).fetchall()
+    return {int(r[0]) for r in rows}
+
+
+def load_partition(conn, table, month, df, unique_key, natural_key=None, candidates=None):
+    """
+    Upsert das linhas do mês na partição, depois de remover de outros meses as
+    versões antigas de `candidates` (mesma transação); retorna (linhas, date_key removidos).
+    """
+    moved = delete_moved(conn, table, candidates, natural_key) if natural_key else set()
+    return bulk_upsert(conn, partition_name(table, month), df, unique_key), moved
+
+
+def load_chunk(conn, table, df, unique_key, natural_key=None, candidates=None, ledger=None, batch=None):
+    """
+    Chunk inteiro na transação de `conn`: remove de outros meses as versões
+    antigas de `candidates`, faz o upsert de cada mês na sua partição e, com
+    `ledger`, registra `batch` com os date_key removidos. Retorna (linhas, date_key removidos).
+    """
+    moved = delete_moved(conn, table, candidates, natural_key) if natural_key else set()
+    rows = sum(bulk_upsert(conn, partition_name(table, month), part, unique_key)
+               for month, part in split_by_month(df).items())
+    if ledger is not None:
+        ledger.record(conn, batch, df, 'date_key', moved)
+    return rows, moved
+
+
+# --- processos de carga ---
+_worker_engine = None
+
+
+def _init_worker(url):
+    global _worker_engine
+    # engine próprio por processo (nada herdado do pai); a conexão é reaproveitada entre partições
+    _worker_engine = get_engine(url, pool_size=1)
+
+
+def _load_partition(job):
+    with _worker_engine.begin() as conn:
+        return load_partition(conn, *job)
+
+
+def _load_chunk(job):
+    with _worker_engine.begin() as conn:
+        return load_chunk(conn, *job)
+
+
+class PartitionLoader:
+    """
+    Upsert de chunks de fatos direto nas partições mensais, em paralelo.
+    Cada partição é uma transação independente; a carga é idempotente
+    (upsert na chave natural), então repetir um chunk após falha é seguro.
+    Com `natural_key` (unique_key sem a coluna de partição), as linhas
+    marcadas em `may_move` saem do mês antigo na transação da partição nova;
+    os date_key removidos pelo último load() ficam em `moved`.
+
+    submit() é o modo com checkpoint: um chunk por transação (load_chunk),
+    até `workers` chunks gravando ao mesmo tempo; os resultados chegam em
+    ordem de envio por submit()/drain(), que somam os date_key removidos em `moved`.
+    """
+
+    def __init__(self, engine, table, unique_key, workers=PARTITION_WORKERS, natural_key=None):
+        self.engine = engine
+        self.table = table
+        self.unique_key = unique_key
+        self.workers = workers
+        self.natural_key = natural_key
+        self.moved = set()
+        self._pool = None
+        self._pending = deque()
+
+    def __enter__(self):
+        if self.workers > 1:
+            # spawn: o processo pai tem threads (DAG) e conexões abertas
+            url = self.engine.url.render_as_string(hide_password=False)
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker, initargs=(url,))
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool:
+            # saída com erro: chunks ainda na fila não começam
+            self._pool.shutdown(cancel_futures=exc[0] is not None)
+            self._pool = None
+        self._pending.clear()
+
+    def candidates(self, df, may_move):
+        """Linhas de `df` marcadas em `may_move` (podem estar gravadas em outro mês)."""
+        if not self.natural_key or may_move is None:
+            return None
+        return df[may_move.loc[df.index].to_numpy(dtype=bool, na_value=False)]
+
+    def jobs(self, df, may_move=None):
+        """Argumentos de load_partition por mês do chunk."""
+        parts = split_by_month(df)
+        return [(self.table, month, part, self.unique_key, self.natural_key, self.candidates(part, may_move))
+                for month, part in parts.items()]
+
+    def load(self, df, may_move=None):
+        """
+        Carrega um chunk; `may_move` (máscara booleana) marca as linhas que podem
+        estar gravadas em outro mês. Retorna o número de linhas enviadas.
+        """
+        self.moved = set()
+        if df.empty:
+            return 0
+        jobs = self.jobs(df, may_move)
+        # partições criadas numa transação curta (CREATE ... PARTITION OF trava a tabela pai)
+        with self.engine.begin() as conn:
+            ensure_partitions(conn, self.table, [job[1] for job in jobs])
+        if self._pool is None or len(jobs) == 1:
+            with self.engine.begin() as conn:
+                results = [load_partition(conn, *job) for job in jobs]
+        else:
+            results = list(self._pool.map(_load_partition, jobs))
+        for _, moved in results:
+            self.moved |= moved
+        return sum(rows for rows, _ in results)
+
+    def submit(self, df, may_move=None, ledger=None, batch=None):
+        """
+        Grava o chunk numa transação só, com o registro `batch` no `ledger`.
+        Com processos, espera vaga (no máximo `workers` chunks em andamento) e
+        volta sem esperar este; retorna as linhas dos chunks concluídos na espera.
+        """
+        if df.empty:
+            return 0
+        with self.engine.begin() as conn:
+            ensure_partitions(conn, self.table, (df['date_key'] // 100).unique())
+        job = (self.table, df, self.unique_key, self.natural_key, self.candidates(df, may_move), ledger, batch)
+        if self._pool is None:
+            with self.engine.begin() as conn:
+                rows, moved = load_chunk(conn, *job)
+            self.moved |= moved
+            return rows
+        rows = 0
+        while len(self._pending) >= self.workers:
+            rows += self._collect()
+        self._pending.append(self._pool.submit(_load_chunk, job))
+        return rows
+
+    def drain(self):
+        """Espera os chunks em andamento; retorna as linhas deles."""
+        rows = 0
+        while self._pending:
+            rows += self._collect()
+        return rows
+
+    def _collect(self):
+        # o mais antigo primeiro; uma falha é relançada aqui
+        rows, moved = self._pending.popleft().result()
+        self.moved |= moved
+        return rows
+
+
+def swap_partition(conn, table, month, df, unique_key=None):
+    """
+    Substitui o mês inteiro por `df`: tabela nova -> COPY -> DETACH da antiga ->
+    ATTACH da nova -> DROP da antiga, tudo na transação de `conn`.
+    Índices e FKs da tabela pai são criados/validados no ATTACH, de uma vez.
+    """
+    if unique_key:
+        df = df.drop_duplicates(subset=unique_key, keep='last')
+    name = partition_name(table, month)
+    new = f"{name}_new"
+    lo, hi = month_bounds(month)
+    conn.execute(text(f"DROP TABLE IF EXISTS {new}"))
+    conn.execute(text(f"CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS)"))
+    # CHECK igual aos limites da partição: o ATTACH não precisa varrer a tabela
+    conn.execute(text(
+        f"ALTER TABLE {new} ADD CONSTRAINT {new}_bounds CHECK (date_key >= {lo} AND date_key < {hi})"
+    ))
+    copy_dataframe(conn, df, new)
+    if name in existing_partitions(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    conn.execute(text(f"ALTER TABLE {new} RENAME TO {name}"))
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({lo}) TO ({hi})"))
+    conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {new}_bounds"))
+    return len(df)
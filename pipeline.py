@@ -0,0 +1,107 @@
+# pipeline.py
+"""
+Pipeline produtor/consumidor: extração e carga sobrepostas.
+
+O produtor (a thread que chama run_pipeline) percorre o gerador de chunks:
+consulta à fonte via cursor do servidor + transform. Cada chunk pronto entra
+numa fila limitada, consumida por WRITERS threads que gravam no DW (COPY +
+upsert), cada uma com a sua conexão do pool. Fila cheia bloqueia o produtor
+(backpressure: no máximo DEPTH chunks prontos em memória além dos que estão
+sendo gravados); fila vazia deixa os writers esperando. Como psycopg2 e o I/O
+de rede liberam o GIL, fonte, rede, CPU e DW trabalham ao mesmo tempo e o
+tempo total tende a max(extração, carga) em vez da soma.
+"""
+
+import queue
+import threading
+import time
+
+# threads gravando no DW (cada uma ocupa uma conexão do pool)
+WRITERS = 3
+# chunks prontos aguardando gravação
+DEPTH = 4
+
+_DONE = object()
+_POLL = 0.1  # s; intervalo para notar uma falha do outro lado
+
+
+def run_pipeline(items, load, writers=WRITERS, depth=DEPTH):
+    """
+    Aplica `load(item)` em `writers` threads a cada item de `items`, consumido na
+    thread atual. Retorna (resultados de load, estatísticas). Uma falha de
+    qualquer lado interrompe os dois e é relançada.
+    """
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    errors = []
+    results = []
+    stats = {'chunks': 0, 'writers': writers, 'producer_blocked_s': 0.0, 'writers_idle_s': 0.0}
+    lock = threading.Lock()
+
+    def put(item):
+        # espera espaço na fila, mas desiste se algum writer falhou
+        t0 = time.perf_counter()
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                break
+            except queue.Full:
+                continue
+        stats['producer_blocked_s'] += time.perf_counter() - t0
+
+    def write():
+        idle = 0.0
+        try:
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    item = q.get(timeout=_POLL)
+                except queue.Empty:
+                    idle += time.perf_counter() - t0
+                    continue
+                idle += time.perf_counter() - t0
+                if item is _DONE:
+                    break
+                result = load(item)
+                with lock:
+                    results.append(result)
+        except BaseException as exc:
+            with lock:
+                errors.append(exc)
+            stop.set()
+        finally:
+            with lock:
+                stats['writers_idle_s'] += idle
+
+    threads = [threading.Thread(target=write, name=f'pipeline-writer-{i}', daemon=True) for i in range(writers)]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    try:
+        for item in items:
+            put(item)
+            if stop.is_set():
+                break
+            stats['chunks'] += 1
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        if hasattr(items, 'close'):
+            # libera o cursor da fonte se a carga parou no meio
+            items.close()
+        for _ in threads:
+            put(_DONE)
+        for t in threads:
+            t.join()
+        stats['seconds'] = time.perf_counter() - t0
+    if errors:
+        raise errors[0]
+    return results, stats
+
+
+def print_stats(name, stats):
+    """Quem segurou o pipeline: produtor bloqueado = carga é o gargalo; writers ociosos = extração."""
+    print(f"pipeline {name}: {stats['chunks']} chunks em {stats['seconds']:.1f}s, "
+          f"produtor bloqueado {stats['producer_blocked_s']:.1f}s, "
+          f"writers ociosos {stats['writers_idle_s'] / max(stats['writers'], 1):.1f}s (média)")
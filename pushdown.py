@@ -0,0 +1,54 @@
+# pushdown.py
+"""
+Pushdown de transformações para o SQL de extração.
+
+No modo pushdown as derivações (date_key inteiro, line_total, gross_margin,
+custo do produto via join em production_product) e a deduplicação
+(DISTINCT ON) saem prontas da consulta à fonte: trafega só o resultado final
+e o pandas não refaz o trabalho. compare_frames confere que o caminho pandas
+e o pushdown produzem a mesma saída.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+
+def date_key_sql(col):
+    """Expressão SQL do date_key AAAAMMDD (mesmo valor de calendar_dim.date_keys)."""
+    return (f"(EXTRACT(YEAR FROM {col}) * 10000 + EXTRACT(MONTH FROM {col}) * 100"
+            f" + EXTRACT(DAY FROM {col}))::int")
+
+
+def _normalize(df, key):
+    df = df.sort_values(key, kind='stable').reset_index(drop=True)
+    for col in df.columns:
+        # categorias de cada caminho podem diferir: compara os valores
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+        # NUMERIC chega como Decimal (object); compara como número
+        if df[col].dtype == object and df[col].map(lambda v: isinstance(v, Decimal)).any():
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def compare_frames(expected, actual, key, rtol=1e-9):
+    """Colunas em que `actual` difere de `expected` ([] = mesma saída), ordenando pela chave."""
+    if sorted(expected.columns) != sorted(actual.columns):
+        return sorted(set(expected.columns) ^ set(actual.columns))
+    if len(expected) != len(actual):
+        return ['<número de linhas>']
+    exp = _normalize(expected, key)
+    act = _normalize(actual[list(expected.columns)], key)
+    diffs = []
+    for col in exp.columns:
+        a, b = exp[col], act[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            same = np.isclose(a.to_numpy(dtype=float, na_value=np.nan), b.to_numpy(dtype=float, na_value=np.nan),
+                              rtol=rtol, equal_nan=True)
+        else:
+            same = ((a == b) | (a.isna() & b.isna())).to_numpy()
+        if not same.all():
+            diffs.append(col)
+    return diffs
@@ -0,0 +1,96 @@
+# scd2.py
+"""
+Dimensões de mudança lenta tipo 2 (SCD2).
+
+Cada versão de um membro tem valid_from (inclusivo), valid_to (exclusivo,
+NULL = vigente) e is_current; um índice único parcial garante uma única linha
+corrente por chave natural. A carga de um lote é set-based: o lote vai para o
+staging via COPY, um UPDATE expira as versões correntes cujo row_hash mudou e
+um INSERT ... SELECT cria as novas versões (membros novos + alterados). Uma
+segunda mudança no mesmo dia sobrescreve a versão aberta naquele dia, sem
+deixar versão com valid_from = valid_to.
+Membros inferidos (inferred.py) são sobrescritos no lugar quando o membro
+real chega: a versão provisória vira a versão real, sem histórico novo.
+"""
+
+import datetime
+
+from sqlalchemy import text
+
+from bulk_load import stage_dataframe
+
+# início da primeira versão de um membro (cobre fatos históricos)
+FIRST_VALID_FROM = datetime.date(1900, 1, 1)
+
+
+def load_scd2(conn, table, df, unique_key, effective_date, hash_col='row_hash', inferred_col=None, key_col=None):
+    """
+    Aplica um lote (df com row_hash) na dimensão SCD2 `table`.
+    Retorna {'inserted', 'expired', 'updated'} — expired = versões encerradas
+    (membros alterados), updated = versões abertas no mesmo dia e sobrescritas —
+    e, com `inferred_col`, 'inferred' = membros inferidos preenchidos no lugar
+    (com `key_col`, as chaves substitutas deles ficam em 'inferred_keys').
+    """
+    counts = {'inserted': 0, 'expired': 0, 'updated': 0}
+    if df.empty:
+        return counts
+    df = df.drop_duplicates(subset=[unique_key], keep='last')
+    stage = stage_dataframe(conn, df, table)
+    attrs = ', '.join(f"{c} = s.{c}" for c in df.columns if c != unique_key)
+    params = {'eff': effective_date, 'first': FIRST_VALID_FROM}
+
+    if inferred_col:
+        # 0) membro inferido: a versão corrente provisória recebe os atributos
+        #    reais (mesma chave, mesmo valid_from) e deixa de ser inferida
+        filled = conn.execute(text(f"""
+            UPDATE {table} t
+            SET {attrs}, {inferred_col} = false
+            FROM {stage} s
+            WHERE t.{unique_key} = s.{unique_key}
+              AND t.is_current
+              AND t.{inferred_col}
+            RETURNING t.{key_col or unique_key}
+        """)).fetchall()
+        counts['inferred'] = len(filled)
+        if key_col:
+            counts['inferred_keys'] = [row[0] for row in filled]
+
+    # 1) versão corrente aberta na mesma data efetiva (segunda mudança no dia):
+    #    sobrescrita no lugar, sem versão de duração zero
+    counts['updated'] = conn.execute(text(f"""
+        UPDATE {table} t
+        SET {attrs}
+        FROM {stage} s
+        WHERE t.{unique_key} = s.{unique_key}
+          AND t.is_current
+          AND t.valid_from = :eff
+          AND t.{hash_col} IS DISTINCT FROM s.{hash_col}
+    """), params).rowcount
+
+    # 2) encerra a versão corrente (de antes da data efetiva) dos membros cujo conteúdo mudou
+    counts['expired'] = conn.execute(text(f"""
+        UPDATE {table} t
+        SET valid_to = :eff, is_current = false
+        FROM {stage} s
+        WHERE t.{unique_key} = s.{unique_key}
+          AND t.is_current
+          AND t.valid_from < :eff
+          AND t.{hash_col} IS DISTINCT FROM s.{hash_col}
+    """), params).rowcount
+
+    # 3) nova versão corrente para quem ficou sem (membros novos + expirados acima);
+    #    membro sem histórico começa em FIRST_VALID_FROM
+    cols = ','.join(df.columns)
+    s_cols = ','.join(f's.{c}' for c in df.columns)
+    counts['inserted'] = conn.execute(text(f"""
+        INSERT INTO {table} ({cols}, valid_from, valid_to, is_current)
+        SELECT {s_cols},
+               CASE WHEN EXISTS (SELECT 1 FROM {table} h WHERE h.{unique_key} = s.{unique_key})
+                    THEN CAST(:eff AS DATE) ELSE CAST(:first AS DATE) END,
+               NULL, true
+        FROM {stage} s
+        WHERE NOT EXISTS (
+          SELECT 1 FROM {table} c WHERE c.{unique_key} = s.{unique_key} AND c.is_current
+        )
+    """), params).rowcount
+    return counts
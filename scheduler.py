@@ -0,0 +1,78 @@
+# scheduler.py
+"""
+Agendador mínimo de tarefas em DAG sobre um pool de threads.
+
+Tarefas independentes (ex.: extract/transform/load de cada dimensão) rodam em
+paralelo; uma tarefa só começa quando todas as suas dependências terminaram
+(ex.: fact_sales depende de todas as dimensões por causa das FKs). O tempo de
+parede de cada tarefa é registrado para expor o caminho crítico.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Threads padrão (cada tarefa usa uma conexão do pool do engine)
+MAX_WORKERS = 4
+
+
+def run_dag(tasks, max_workers=MAX_WORKERS):
+    """
+    tasks: {nome: (função sem argumentos, [dependências])}
+    Retorna (resultados, tempos) — tempos[nome] = (início, fim) relativos ao início do DAG.
+    Uma falha cancela as tarefas ainda não iniciadas e é relançada.
+    """
+    for name, (_, deps) in tasks.items():
+        unknown = set(deps) - set(tasks)
+        if unknown:
+            raise ValueError(f"tarefa {name} depende de tarefas inexistentes: {sorted(unknown)}")
+
+    t0 = time.perf_counter()
+    results, timings = {}, {}
+    pending = dict(tasks)
+    running = {}
+
+    def timed(name, fn):
+        start = time.perf_counter() - t0
+        try:
+            return fn()
+        finally:
+            timings[name] = (start, time.perf_counter() - t0)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            ready = [n for n, (_, deps) in pending.items() if all(d in results for d in deps)]
+            for name in ready:
+                fn, _ = pending.pop(name)
+                running[pool.submit(timed, name, fn)] = name
+            if not running:
+                raise ValueError(f"dependência circular entre: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                exc = fut.exception()
+                if exc is not None:
+                    for other in running:
+                        other.cancel()
+                    raise exc
+                results[name] = fut.result()
+    return results, timings
+
+
+def critical_path(tasks, timings):
+    """Cadeia de dependências que terminou por último (o que limita o tempo total)."""
+    path = []
+    name = max(timings, key=lambda n: timings[n][1]) if timings else None
+    while name is not None:
+        path.append(name)
+        deps = tasks[name][1]
+        name = max(deps, key=lambda n: timings[n][1]) if deps else None
+    return path[::-1]
+
+
+def print_timings(tasks, timings):
+    for name, (start, end) in sorted(timings.items(), key=lambda kv: kv[1][0]):
+        print(f"  {name:20s} {start:8.2f}s -> {end:8.2f}s  ({end - start:.2f}s)")
+    path = critical_path(tasks, timings)
+    if path:
+        print(f"  caminho crítico: {' -> '.join(path)} ({timings[path[-1]][1]:.2f}s)")
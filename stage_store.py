@@ -0,0 +1,115 @@
+# stage_store.py
+"""
+Staging colunar (Arrow IPC ou Parquet) entre a extração e a carga.
+
+Cada chunk extraído é gravado em <dir>/<tabela>/ com os dtypes compactos da
+consulta (dtypes.py: category, Int32...) antes de ser carregado, e um
+manifest.json registra a marca d'água inicial e os arquivos já gravados. Se a carga falhar no meio, a execução seguinte reaplica os
+arquivos (leitura via memory map) sem consultar a fonte OLTP de novo.
+pyarrow é opcional: só é exigido quando o staging está ligado.
+"""
+
+import datetime
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from dtypes import compact
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # staging indisponível sem pyarrow
+    pa = None
+
+# 'arrow' (IPC, mapeável em memória sem cópia) ou 'parquet' (comprimido)
+STAGE_FORMAT = 'arrow'
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("staging colunar requer pyarrow (pip install pyarrow)")
+
+
+class ChunkStage:
+    """Chunks de uma tabela em <root>/<tabela>/chunk_NNNNNN.<formato> + manifest.json."""
+
+    def __init__(self, root, table, fmt=STAGE_FORMAT):
+        _require_pyarrow()
+        self.dir = os.path.join(root, table)
+        self.table = table
+        self.fmt = fmt
+        self.manifest = None
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.dir, 'manifest.json')
+
+    def _save(self):
+        tmp = self._manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self._manifest_path)
+
+    def start(self, last_id, last_modified):
+        """Novo staging (apaga o anterior) a partir da marca d'água informada."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.makedirs(self.dir)
+        self.manifest = {'table': self.table, 'format': self.fmt, 'last_id': int(last_id),
+                         'last_modified': last_modified.isoformat(), 'complete': False, 'chunks': []}
+        self._save()
+        return self
+
+    @classmethod
+    def open(cls, root, table):
+        """Staging existente (para replay)."""
+        stage = cls(root, table)
+        with open(stage._manifest_path, encoding='utf-8') as f:
+            stage.manifest = json.load(f)
+        stage.fmt = stage.manifest['format']
+        return stage
+
+    def watermark(self):
+        return self.manifest['last_id'], datetime.datetime.fromisoformat(self.manifest['last_modified'])
+
+    def rows(self):
+        return sum(c['rows'] for c in self.manifest['chunks'])
+
+    def write(self, df):
+        name = f"chunk_{len(self.manifest['chunks']):06d}.{self.fmt}"
+        path = os.path.join(self.dir, name)
+        table = pa.Table.from_pandas(compact(df, self.table), preserve_index=False)
+        if self.fmt == 'parquet':
+            pq.write_table(table, path)
+        else:
+            with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # o manifest só lista o arquivo depois de gravado por inteiro
+        self.manifest['chunks'].append({'file': name, 'rows': len(df)})
+        self._save()
+        return path
+
+    def tee(self, chunks):
+        """Grava cada chunk no staging e repassa adiante; marca completo ao esgotar."""
+        for chunk in chunks:
+            self.write(chunk)
+            yield chunk
+        self.manifest['complete'] = True
+        self._save()
+
+    def read(self):
+        """Gera os chunks gravados, na ordem da extração (leitura via memory map)."""
+        # inteiros/booleanos com nulos voltam nos dtypes anuláveis (e não float64/object)
+        types = {pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype(),
+                 pa.bool_(): pd.BooleanDtype()}.get
+        for entry in self.manifest['chunks']:
+            path = os.path.join(self.dir, entry['file'])
+            if self.fmt == 'parquet':
+                df = pq.read_table(path, memory_map=True).to_pandas(types_mapper=types)
+            else:
+                with pa.memory_map(path) as source:
+                    df = pa.ipc.open_file(source).read_all().to_pandas(types_mapper=types)
+            yield df
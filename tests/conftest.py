@@ -0,0 +1,63 @@
+# conftest.py
+"""
+Testes sem banco: frames pequenos em memória e conexões falsas.
+
+Os módulos do ETL ficam na raiz do repositório, ao lado de sqlalchemy.py (o
+script do DW do AdventureWorks), que esconderia o pacote sqlalchemy se a raiz
+viesse antes dele no sys.path (python -m pytest põe o diretório atual na
+frente). A raiz vai para o fim: o pacote instalado é achado primeiro.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != ROOT]
+sys.path.append(ROOT)
+
+
+class FakeResult:
+
+    def __init__(self, rows=(), rowcount=None):
+        self.rows = list(rows)
+        self.rowcount = len(self.rows) if rowcount is None else rowcount
+
+    def fetchall(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeConn:
+    """
+    Conexão que só registra as instruções (SQL normalizado, parâmetros).
+    `results`: funções sql -> FakeResult (ou None), consultadas em ordem.
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.executed = []
+
+    def execute(self, stmt, params=None):
+        sql = ' '.join(str(stmt).split())
+        self.executed.append((sql, params))
+        for result in self.results:
+            out = result(sql)
+            if out is not None:
+                return out
+        return FakeResult()
+
+
+@pytest.fixture
+def fake_conn():
+    return FakeConn
@@ -0,0 +1,117 @@
+import datetime
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pandas as pd
+
+import batches
+from batches import NO_RESUME, BatchLedger
+from conftest import FakeResult
+
+Row = namedtuple('Row', 'batch_no last_id max_modified row_count')
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def day(n):
+    return START + datetime.timedelta(days=n)
+
+
+def ledger_rows(*rows):
+    def result(sql):
+        if sql.startswith('SELECT batch_no'):
+            return FakeResult([Row(*r) for r in rows])
+        return None
+    return result
+
+
+def opened(fake_conn, *rows):
+    conn = fake_conn(ledger_rows(*rows))
+    ledger = BatchLedger('fact_sales', 'run-2')
+    params = ledger.open(conn, 100, START)
+    return ledger, params, conn
+
+
+def test_open_without_batches_does_not_resume(fake_conn):
+    ledger, params, _ = opened(fake_conn)
+    assert params == {'resume_id': NO_RESUME, 'resume_modified': None}
+    assert ledger.next_batch == 0
+    assert ledger.run_key == '100|2024-01-01T00:00:00'
+
+
+def test_open_resumes_after_contiguous_prefix_only(fake_conn):
+    # o lote 2 faltou: o 3 (gravado fora de ordem) não conta e será recarregado
+    ledger, params, conn = opened(fake_conn, (0, 150, day(3), 10), (1, 200, day(1), 10), (3, 400, day(9), 10))
+    assert params == {'resume_id': 200, 'resume_modified': day(3)}
+    assert ledger.next_batch == 2
+    assert [r.batch_no for r in ledger.committed] == [0, 1]
+    # as linhas depois do buraco ficam no ledger (date_keys juntados no novo registro)
+    assert not any(sql.startswith('DELETE') for sql, _ in conn.executed)
+    select = [p for sql, p in conn.executed if sql.startswith('SELECT batch_no')]
+    assert select == [{'job': 'fact_sales', 'run_key': '100|2024-01-01T00:00:00'}]
+
+
+def test_open_prefix_must_start_at_zero(fake_conn):
+    ledger, params, _ = opened(fake_conn, (1, 200, day(1), 10))
+    assert params['resume_id'] == NO_RESUME and ledger.next_batch == 0
+
+
+def test_restore_advances_watermark_to_committed_batches(fake_conn):
+    ledger, _, _ = opened(fake_conn, (0, 150, day(3), 10), (1, 200, None, 10))
+    mark = ledger.restore(SimpleNamespace(last_id=100, last_modified=START))
+    assert (mark.last_id, mark.last_modified) == (200, day(3))
+    mark = ledger.restore(SimpleNamespace(last_id=500, last_modified=day(7)))
+    assert (mark.last_id, mark.last_modified) == (500, day(7))
+
+
+def test_skip_keeps_new_ids_and_rows_modified_after_resume(fake_conn):
+    ledger, _, _ = opened(fake_conn, (0, 200, day(3), 10))
+    chunks = [
+        pd.DataFrame({'id': [150, 180], 'modified': [day(1), day(2)]}),
+        pd.DataFrame({'id': [190, 201, 202], 'modified': [day(5), day(1), day(2)]}),
+    ]
+    out = list(ledger.skip(iter(chunks), 'id', 'modified'))
+    # o primeiro chunk some inteiro; 190 mudou depois do último modifieddate visto
+    assert len(out) == 1
+    assert out[0]['id'].tolist() == [190, 201, 202]
+
+
+def test_skip_without_resume_passes_chunks_through(fake_conn):
+    ledger, _, _ = opened(fake_conn)
+    chunk = pd.DataFrame({'id': [1, 2], 'modified': [day(1), day(2)]})
+    assert [len(c) for c in ledger.skip([chunk, chunk.iloc[:0]], 'id', 'modified')] == [2]
+
+
+def test_batch_numbering_continues_after_prefix(fake_conn):
+    ledger, _, _ = opened(fake_conn, (0, 150, day(3), 10))
+    first = ledger.batch(pd.Series([160, 151, 170]), pd.Series([day(2), day(4), day(1)]))
+    second = ledger.batch(pd.Series([171]), pd.Series([day(5)]))
+    assert first == {'batch_no': 1, 'first_id': 151, 'last_id': 170, 'max_modified': day(4)}
+    assert second['batch_no'] == 2 and ledger.next_batch == 3
+
+
+def test_record_merges_written_and_moved_date_keys(fake_conn, monkeypatch):
+    calls = []
+    monkeypatch.setattr(batches, 'execute_prepared', lambda conn, name, sql, rows: calls.append((name, rows)))
+    ledger, _, conn = opened(fake_conn)
+    batch = ledger.batch(pd.Series([1, 2]), pd.Series([day(1), day(2)]))
+    df = pd.DataFrame({'date_key': [20240105, 20240105, 20240201], 'qty': [1, 2, 3]})
+
+    ledger.record(conn, batch, df, 'date_key', {20231231, 20240201})
+
+    assert calls == [('etl_batches_record', [(
+        'fact_sales', '100|2024-01-01T00:00:00', 0, 'run-2', 1, 2, day(2), 3,
+        [20231231, 20240105, 20240201],
+    )])]
+    assert 'date_keys = dw.etl_batches.date_keys || EXCLUDED.date_keys' in ' '.join(batches.RECORD_SQL.split())
+
+
+def test_date_keys_and_complete_scope_to_open_run(fake_conn):
+    conn = fake_conn(ledger_rows(), lambda sql: FakeResult([(20240105,), (20240201,)]) if 'unnest' in sql else None)
+    ledger = BatchLedger('fact_sales', 'run-2')
+    ledger.open(conn, 100, START)
+    assert ledger.date_keys(conn) == {20240105, 20240201}
+    ledger.complete(conn)
+    sql, params = conn.executed[-1]
+    assert sql.startswith('UPDATE dw.etl_batches SET completed = true') and 'NOT completed' in sql
+    assert params == {'job': 'fact_sales', 'run_key': ledger.run_key}
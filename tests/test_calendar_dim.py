@@ -0,0 +1,45 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from calendar_dim import CalendarCache, build_calendar, date_keys
+
+
+def test_date_keys_match_strftime():
+    dates = pd.to_datetime(['2003-01-01 00:00:00', '2004-02-29 12:00:00', '2011-12-31 23:59:59', '1999-07-04 08:30:00'])
+    expected = [int(d.strftime('%Y%m%d')) for d in dates]
+    assert date_keys(dates).tolist() == expected
+
+
+def test_build_calendar_attributes():
+    cal = build_calendar('2023-12-30', '2024-01-02')
+    assert cal['date_key'].tolist() == [20231230, 20231231, 20240101, 20240102]
+    assert cal['year'].tolist() == [2023, 2023, 2024, 2024]
+    assert cal['quarter'].tolist() == [4, 4, 1, 1]
+    assert cal['month_name'].tolist() == ['December', 'December', 'January', 'January']
+    # 2023-12-30 foi sábado
+    assert cal['weekday'].tolist() == [6, 7, 1, 2]
+    assert cal['day_name'].tolist() == ['Saturday', 'Sunday', 'Monday', 'Tuesday']
+    assert cal['is_weekend'].tolist() == [True, True, False, False]
+
+
+def test_build_calendar_weekday_matches_isoweekday():
+    cal = build_calendar('2020-01-01', '2020-12-31')
+    expected = [d.isoweekday() for d in cal['full_date']]
+    assert len(cal) == 366
+    assert np.array_equal(cal['weekday'].to_numpy(), expected)
+
+
+def test_calendar_cache_loads_each_year_once():
+    loads = []
+    cache = CalendarCache(loads.append)
+    cache.ensure(pd.Series(pd.to_datetime(['2004-05-01', '2003-01-15'])))
+    cache.ensure([datetime.date(2004, 12, 31)])
+    cache.ensure(pd.Series(pd.to_datetime(['2005-01-01'])))
+
+    assert len(loads) == 2
+    assert sorted(set(loads[0]['year'])) == [2003, 2004]
+    assert len(loads[0]) == 365 + 366
+    assert set(loads[1]['year']) == {2005}
+    assert cache.years == {2003, 2004, 2005}
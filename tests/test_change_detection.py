@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+import change_detection
+from change_detection import HASH_COL, add_row_hash, changed_rows, read_dtypes, row_hash
+from dtypes import compact
+
+ATTRS = ['name', 'color', 'listprice', 'discontinued', 'territoryid']
+
+
+def read_frame():
+    # como o read_sql devolve: int64/float64, texto e booleano com None em object
+    return pd.DataFrame({
+        'productid': np.array([1, 2, 3, 4], dtype=np.int64),
+        'name': ['Bike', 'Helmet', 'Glove', 'Light'],
+        'color': ['Red', None, 'Black', 'Red'],
+        'listprice': [1000.0, 35.5, np.nan, 12.0],
+        'discontinued': pd.Series([True, None, False, False], dtype=object),
+        'territoryid': [1.0, np.nan, 3.0, 1.0],
+    })
+
+
+def test_row_hash_is_stable_across_compact_dtypes():
+    df = read_frame()
+    compacted = compact(df, 'dim_product')
+    assert str(compacted['color'].dtype) == 'category'
+    assert str(compacted['discontinued'].dtype) == 'boolean'
+    assert str(compacted['territoryid'].dtype) == 'Int32'
+    assert np.array_equal(row_hash(df, ATTRS), row_hash(compacted, ATTRS))
+
+
+def test_row_hash_without_nulls_is_stable_across_compact_dtypes():
+    df = read_frame().dropna().assign(discontinued=lambda d: d['discontinued'].astype(bool))
+    df['territoryid'] = df['territoryid'].astype(np.int64)
+    assert np.array_equal(row_hash(df, ATTRS), row_hash(compact(df, 'dim_product'), ATTRS))
+
+
+def test_read_dtypes_restores_read_sql_dtypes():
+    out = read_dtypes(compact(read_frame(), 'dim_product'))
+    assert out['territoryid'].dtype == np.float64
+    assert out['discontinued'].tolist() == [True, None, False, False]
+    assert out['productid'].dtype == np.int64
+
+
+def test_row_hash_changes_with_tracked_attribute_only():
+    df = read_frame()
+    changed = df.assign(listprice=[1000.0, 36.0, np.nan, 12.0])
+    a, b = row_hash(df, ATTRS), row_hash(changed, ATTRS)
+    assert (a != b).tolist() == [False, True, False, False]
+    # a chave natural não entra no hash
+    assert np.array_equal(add_row_hash(df, 'productid')[HASH_COL],
+                          add_row_hash(df.assign(productid=[9, 8, 7, 6]), 'productid')[HASH_COL])
+
+
+def test_changed_rows_keeps_new_and_changed_keys(monkeypatch):
+    df = add_row_hash(read_frame(), 'productid')
+    dw = pd.DataFrame({'productid': [1, 2, 3],
+                       '_dw_hash': [df[HASH_COL].iloc[0], df[HASH_COL].iloc[1] + 1, df[HASH_COL].iloc[2]]})
+    queries = []
+
+    def read_sql(sql, conn):
+        queries.append(str(sql))
+        return dw
+
+    monkeypatch.setattr(change_detection.pd, 'read_sql', read_sql)
+    out = changed_rows(None, 'dim_product', df, 'productid', where='is_current')
+
+    # 2: hash diferente; 4: chave nova
+    assert out['productid'].tolist() == [2, 4]
+    assert 'AND (is_current)' in queries[0]
@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+import key_cache
+from key_cache import SurrogateKeyCache
+
+
+def versions(*rows):
+    return pd.DataFrame(rows, columns=['id', 'key', 'valid_from', 'valid_to', 'is_current']).assign(
+        valid_from=lambda d: pd.to_datetime(d['valid_from']),
+        valid_to=lambda d: pd.to_datetime(d['valid_to']),
+    )
+
+
+@pytest.fixture
+def product_cache(monkeypatch):
+    """Cache SCD2 de 'product' carregado de um frame de versões (sem banco)."""
+    def load(df):
+        monkeypatch.setattr(key_cache.pd, 'read_sql', lambda sql, conn: df)
+        cache = SurrogateKeyCache(scd2=['product'])
+        cache.load_versions(None, 'product')
+        return cache
+    return load
+
+
+def resolve(cache, ids, dates):
+    return cache.resolve('product', pd.Series(ids), pd.Series(pd.to_datetime(dates))).tolist()
+
+
+def test_asof_lookup_picks_version_in_force(product_cache):
+    cache = product_cache(versions(
+        (10, 1, '1900-01-01', '2004-01-01', False),
+        (10, 2, '2004-01-01', None, True),
+        (20, 3, '1900-01-01', None, True),
+    ))
+    assert resolve(cache, [10, 10, 10, 20], ['2003-12-31', '2004-01-01', '2010-05-01', '1990-01-01']) == [1, 2, 2, 3]
+
+
+def test_asof_lookup_misses_unknown_ids_and_dates_before_history(product_cache):
+    cache = product_cache(versions(
+        (10, 1, '2004-01-01', None, True),
+    ))
+    out = cache.resolve('product', pd.Series([10, 11, None]), pd.Series(pd.to_datetime(['2003-01-01', '2005-01-01', '2005-01-01'])))
+    assert out.isna().tolist() == [True, True, True]
+    assert cache.misses['product'] == 2
+    assert cache.missing['product'] == {10, 11}
+
+
+def test_asof_lookup_after_expired_version_without_successor(product_cache):
+    # membro encerrado sem versão nova: nada vigente depois do fim
+    cache = product_cache(versions(
+        (10, 1, '1900-01-01', '2004-01-01', False),
+    ))
+    assert pd.isna(resolve(cache, [10], ['2004-06-01'])[0])
+
+
+def test_zero_length_version_ties_resolve_to_successor(product_cache):
+    # versão de duração zero (carga antiga) + sucessora abertas no mesmo dia
+    rows = [
+        (10, 1, '1900-01-01', '2005-03-01', False),
+        (10, 2, '2005-03-01', '2005-03-01', False),
+        (10, 3, '2005-03-01', None, True),
+    ]
+    for order in (rows, rows[::-1], [rows[0], rows[2], rows[1]]):
+        cache = product_cache(versions(*order))
+        assert resolve(cache, [10, 10, 10], ['2005-02-28', '2005-03-01', '2006-01-01']) == [1, 3, 3]
+
+
+def test_current_map_without_dates(product_cache):
+    cache = product_cache(versions(
+        (10, 1, '1900-01-01', '2004-01-01', False),
+        (10, 2, '2004-01-01', None, True),
+    ))
+    assert cache.resolve('product', pd.Series([10])).tolist() == [2]
+
+
+def test_add_keeps_latest_key_and_clears_missing():
+    cache = SurrogateKeyCache()
+    cache.add('territory', [3, 1], [30, 10])
+    assert cache.resolve('territory', pd.Series([1, 2, 3])).tolist() == [10, pd.NA, 30]
+    assert cache.missing['territory'] == {2}
+    cache.add_rows('territory', [(21, 2), (31, 3)])
+    assert cache.resolve('territory', pd.Series([2, 3])).tolist() == [21, 31]
+    assert cache.missing['territory'] == set()
+
+
+def test_inferred_member_resolves_at_any_date(product_cache):
+    cache = product_cache(versions(
+        (10, 1, '2004-01-01', None, True),
+    ))
+    assert cache.unknown('product', [10, 50, 50, None]) == [50]
+    cache.add_inferred('product', [(99, 50)])
+    assert cache.unknown('product', [10, 50]) == []
+    assert resolve(cache, [50, 50, 10], ['1950-01-01', '2010-01-01', '2004-01-01']) == [99, 99, 1]
+
+
+def test_counters_round_trip():
+    cache = SurrogateKeyCache()
+    cache.add('order', [1], [100])
+    cache.resolve('order', pd.Series([1, 2]))
+    counters = cache.take_counters()
+    assert cache.hits['order'] == 0
+    main = SurrogateKeyCache()
+    main.merge_counters(counters)
+    assert main.report()['order'] == {'hits': 1, 'misses': 1, 'missing_ids': 1}
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import parallel_transform
+from key_cache import SurrogateKeyCache
+from parallel_transform import ParallelTransform, shard_bounds
+
+
+def transform(chunk, cache):
+    # função de módulo: precisa ser importável nos processos (spawn)
+    return pd.DataFrame({'salesorderid': chunk['salesorderid'],
+                         'product_key': cache.resolve('product', chunk['productid'])}, index=chunk.index)
+
+
+def chunk(rows=60):
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({'salesorderid': np.repeat(np.arange(rows // 3), 3)[rng.permutation(rows)],
+                         'productid': rng.integers(1, 6, rows)}, index=np.arange(rows) * 2)
+
+
+def cache():
+    c = SurrogateKeyCache()
+    c.add('product', [1, 2, 3, 4], [10, 20, 30, 40])
+    return c
+
+
+def test_shard_bounds_split_whole_orders():
+    keys = np.array([5, 5, 1, 1, 3, 3, 2, 4, 4, 6])
+    bounds = shard_bounds(keys, 3)
+    shard_of = np.searchsorted(bounds, keys, side='right')
+    # as linhas de um pedido caem na mesma fatia
+    for key in np.unique(keys):
+        assert len(set(shard_of[keys == key])) == 1
+    assert len(set(shard_of)) == 3
+    assert len(shard_bounds(keys, 1)) == 0
+    assert len(shard_bounds(np.array([], dtype=np.int64), 4)) == 0
+
+
+def test_without_pool_calls_transform_directly():
+    df = chunk()
+    with ParallelTransform(transform, cache(), workers=1) as pt:
+        pt.sync('add', 'product', [5], [50])  # sem pool: nada a repassar
+        out = pt(df)
+    pd.testing.assert_frame_equal(out, transform(df, cache()))
+    assert pt._updates == []
+
+
+def test_transform_shard_applies_pending_updates_once(monkeypatch):
+    state = cache()
+    monkeypatch.setattr(parallel_transform, '_synced', 0)
+    parallel_transform._init_worker(transform, state)
+    updates = [(1, 'add_rows', ('product', [(50, 5)])), (2, 'add_rows', ('product', [(51, 5)]))]
+
+    out, counters = parallel_transform._transform_shard(chunk(), updates[:1])
+    assert set(out.loc[chunk()['productid'] == 5, 'product_key']) == {50}
+    hits, misses, missing = counters
+    assert hits['product'] + misses['product'] == len(chunk())
+    assert missing['product'] == set()
+
+    # a atualização 1 já foi vista: só a 2 é aplicada
+    state.add_rows('product', [(99, 5)])
+    out, _ = parallel_transform._transform_shard(chunk(), updates)
+    assert set(out.loc[chunk()['productid'] == 5, 'product_key']) == {51}
+    assert parallel_transform._synced == 2
+
+
+def test_process_pool_matches_single_process_and_merges_counters():
+    df = chunk()
+    state = cache()
+    with ParallelTransform(transform, state, workers=2, min_shard_rows=10) as pt:
+        out = pt(df)
+        expected = transform(df, cache())
+        pd.testing.assert_frame_equal(out, expected)
+        assert state.hits['product'] == expected['product_key'].notna().sum()
+        assert state.misses['product'] == expected['product_key'].isna().sum()
+
+        # membro inferido no meio da carga chega aos processos via sync
+        state.add_inferred('product', [(50, 5)])
+        pt.sync('add_inferred', 'product', [(50, 5)])
+        out = pt(df)
+    assert out['product_key'].notna().all()
+    assert set(out.loc[df['productid'] == 5, 'product_key']) == {50}
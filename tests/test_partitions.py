@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+
+import pandas as pd
+
+import partitions
+from partitions import PartitionLoader, load_chunk, month_bounds, split_by_month
+
+
+class FakeEngine:
+    """begin() conta as transações e devolve sempre a mesma conexão falsa."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.transactions = 0
+
+    @contextmanager
+    def begin(self):
+        self.transactions += 1
+        yield self.conn
+
+
+def chunk():
+    return pd.DataFrame({'order_line_id': [1, 2, 3, 4],
+                         'date_key': [20240131, 20240201, 20240105, 20231231],
+                         'qty': [1, 2, 3, 4]}, index=[10, 11, 12, 13])
+
+
+def test_month_bounds_cover_the_month():
+    assert month_bounds(202401) == (20240101, 20240201)
+    assert month_bounds(202312) == (20231201, 20240101)
+
+
+def test_split_by_month():
+    parts = split_by_month(chunk())
+    assert list(parts) == [202312, 202401, 202402]
+    assert parts[202401]['order_line_id'].tolist() == [1, 3]
+
+
+def test_load_chunk_deletes_upserts_and_records_in_one_transaction(fake_conn, monkeypatch):
+    conn = fake_conn()
+    calls = []
+    monkeypatch.setattr(partitions, 'delete_moved',
+                        lambda c, table, df, key: calls.append(('delete', c, df['order_line_id'].tolist())) or {20231115})
+    monkeypatch.setattr(partitions, 'bulk_upsert',
+                        lambda c, table, df, key: calls.append(('upsert', c, table)) or len(df))
+
+    class Ledger:
+        def record(self, c, batch, df, date_col, extra):
+            calls.append(('record', c, batch, date_col, extra))
+
+    df = chunk()
+    rows, moved = load_chunk(conn, 'dw.fact_sales', df, ['order_line_id', 'date_key'], ['order_line_id'],
+                             candidates=df.iloc[:2], ledger=Ledger(), batch={'batch_no': 0})
+
+    assert (rows, moved) == (4, {20231115})
+    assert [c[0] for c in calls] == ['delete', 'upsert', 'upsert', 'upsert', 'record']
+    assert all(c[1] is conn for c in calls)
+    assert [c[2] for c in calls[1:4]] == ['dw.fact_sales_p202312', 'dw.fact_sales_p202401', 'dw.fact_sales_p202402']
+    assert calls[-1][2:] == ({'batch_no': 0}, 'date_key', {20231115})
+
+
+def test_candidates_follow_may_move_mask():
+    loader = PartitionLoader(None, 'dw.fact_sales', ['order_line_id', 'date_key'], workers=1,
+                             natural_key=['order_line_id'])
+    df = chunk()
+    may_move = pd.Series([True, False, pd.NA, True], index=df.index, dtype='boolean')
+    assert loader.candidates(df.iloc[1:], may_move)['order_line_id'].tolist() == [4]
+    assert loader.candidates(df, None) is None
+    jobs = loader.jobs(df, may_move)
+    assert [(job[1], job[5]['order_line_id'].tolist()) for job in jobs] == [(202312, [4]), (202401, [1]), (202402, [])]
+
+
+def test_submit_without_pool_loads_chunk_synchronously(fake_conn, monkeypatch):
+    engine = FakeEngine(fake_conn())
+    ensured, loaded = [], []
+    monkeypatch.setattr(partitions, 'ensure_partitions', lambda conn, table, months: ensured.append(sorted(months)))
+
+    def fake_load_chunk(conn, table, df, unique_key, natural_key, candidates, ledger, batch):
+        loaded.append((candidates['order_line_id'].tolist(), ledger, batch))
+        return len(df), {int(df['date_key'].min())}
+
+    monkeypatch.setattr(partitions, 'load_chunk', fake_load_chunk)
+    df = chunk()
+    with PartitionLoader(engine, 'dw.fact_sales', ['order_line_id', 'date_key'], workers=1,
+                         natural_key=['order_line_id']) as loader:
+        assert loader.submit(df, df['order_line_id'] <= 2, 'ledger', {'batch_no': 3}) == 4
+        assert loader.submit(df.iloc[:0]) == 0
+        assert loader.drain() == 0
+
+    assert ensured == [[202312, 202401, 202402]]
+    assert loaded == [([1, 2], 'ledger', {'batch_no': 3})]
+    assert loader.moved == {20231231}
+    # partições numa transação curta, o chunk em outra
+    assert engine.transactions == 2
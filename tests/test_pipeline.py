@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from pipeline import run_pipeline
+
+
+def test_run_pipeline_loads_every_item():
+    seen = []
+    lock = threading.Lock()
+
+    def load(item):
+        with lock:
+            seen.append(item)
+        return item * 10
+
+    results, stats = run_pipeline(iter(range(20)), load, writers=3, depth=2)
+
+    assert sorted(seen) == list(range(20))
+    assert sorted(results) == [i * 10 for i in range(20)]
+    assert stats['chunks'] == 20
+    assert stats['writers'] == 3
+
+
+def test_run_pipeline_writer_failure_stops_producer_and_closes_source():
+    produced = []
+    closed = []
+
+    def items():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            closed.append(True)
+
+    def load(item):
+        if item == 3:
+            raise RuntimeError('falha na carga')
+        return item
+
+    with pytest.raises(RuntimeError, match='falha na carga'):
+        run_pipeline(items(), load, writers=2, depth=2)
+    assert closed == [True]
+    assert len(produced) < 1000
+
+
+def test_run_pipeline_producer_failure_is_reraised():
+    def items():
+        yield 1
+        raise ValueError('falha na extração')
+
+    with pytest.raises(ValueError, match='falha na extração'):
+        run_pipeline(items(), lambda item: item, writers=2)
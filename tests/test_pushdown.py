@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from pushdown import compare_frames, date_key_sql
+
+
+def test_date_key_sql_uses_column():
+    sql = date_key_sql('h.orderdate')
+    assert sql.count('h.orderdate') == 3
+    assert sql.endswith('::int')
+
+
+def test_compare_frames_same_output_in_other_order():
+    expected = pd.DataFrame({'id': [1, 2, 3], 'date_key': [20040101, 20040102, 20040103],
+                             'margin': [1.5, 2.25, np.nan]})
+    actual = expected.iloc[::-1].reset_index(drop=True)
+    assert compare_frames(expected, actual, ['id']) == []
+
+
+def test_compare_frames_decimal_and_category_compare_by_value():
+    expected = pd.DataFrame({'id': [1, 2], 'total': [10.5, 3.0], 'color': ['Red', 'Blue']})
+    actual = pd.DataFrame({'id': [2, 1], 'total': [Decimal('3.0'), Decimal('10.5')],
+                           'color': pd.Categorical(['Blue', 'Red'])})
+    assert compare_frames(expected, actual, ['id']) == []
+
+
+def test_compare_frames_reports_differences():
+    expected = pd.DataFrame({'id': [1, 2], 'margin': [1.0, 2.0], 'name': ['a', 'b']})
+    assert compare_frames(expected, expected.assign(margin=[1.0, 2.5]), ['id']) == ['margin']
+    assert compare_frames(expected, expected.drop(columns='name'), ['id']) == ['name']
+    assert compare_frames(expected, expected.iloc[:1], ['id']) == ['<número de linhas>']
@@ -0,0 +1,96 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import scd2
+from conftest import FakeResult
+from scd2 import FIRST_VALID_FROM, load_scd2
+
+EFF = datetime.date(2024, 3, 1)
+
+
+@pytest.fixture
+def staged(monkeypatch):
+    """Troca o COPY para o staging por um registro do frame enviado."""
+    frames = []
+
+    def stage_dataframe(conn, df, table):
+        frames.append(df)
+        return 'stage_dim'
+
+    monkeypatch.setattr(scd2, 'stage_dataframe', stage_dataframe)
+    return frames
+
+
+def batch():
+    return pd.DataFrame({'productid': [1, 2, 1], 'name': ['a', 'b', 'a2'], 'row_hash': [10, 20, 11]})
+
+
+def rowcounts(**counts):
+    # UPDATE ... valid_from = :eff -> updated; valid_from < :eff -> expired; INSERT -> inserted
+    def result(sql):
+        if sql.startswith('INSERT'):
+            return FakeResult(rowcount=counts.get('inserted', 0))
+        if 'valid_from = :eff' in sql:
+            return FakeResult(rowcount=counts.get('updated', 0))
+        if 'valid_from < :eff' in sql:
+            return FakeResult(rowcount=counts.get('expired', 0))
+        if 'RETURNING' in sql:
+            return FakeResult([(k,) for k in counts.get('inferred_keys', [])])
+        return None
+    return result
+
+
+def test_empty_batch_runs_nothing(fake_conn, staged):
+    conn = fake_conn()
+    assert load_scd2(conn, 'dw.dim_product', batch().iloc[:0], 'productid', EFF) == \
+        {'inserted': 0, 'expired': 0, 'updated': 0}
+    assert conn.executed == [] and staged == []
+
+
+def test_batch_is_deduplicated_keeping_last_change(fake_conn, staged):
+    load_scd2(fake_conn(), 'dw.dim_product', batch(), 'productid', EFF)
+    assert staged[0]['productid'].tolist() == [2, 1]
+    assert staged[0]['name'].tolist() == ['b', 'a2']
+
+
+def test_statement_order_same_day_before_expire_before_insert(fake_conn, staged):
+    conn = fake_conn(rowcounts(updated=1, expired=2, inserted=3))
+    counts = load_scd2(conn, 'dw.dim_product', batch(), 'productid', EFF)
+
+    assert counts == {'inserted': 3, 'expired': 2, 'updated': 1}
+    sqls = [sql for sql, _ in conn.executed]
+    assert len(sqls) == 3
+    same_day, expire, insert = sqls
+    # a versão aberta hoje é sobrescrita; só as de antes da data efetiva expiram,
+    # então nunca sobra versão com valid_from = valid_to
+    assert same_day.startswith('UPDATE dw.dim_product t SET name = s.name, row_hash = s.row_hash')
+    assert 't.valid_from = :eff' in same_day and 'valid_to' not in same_day
+    assert 'SET valid_to = :eff, is_current = false' in expire and 't.valid_from < :eff' in expire
+    for sql in (same_day, expire):
+        assert 't.row_hash IS DISTINCT FROM s.row_hash' in sql and 't.is_current' in sql
+    assert insert.startswith('INSERT INTO dw.dim_product (productid,name,row_hash, valid_from, valid_to, is_current)')
+    assert 'c.is_current' in insert
+    assert all(params == {'eff': EFF, 'first': FIRST_VALID_FROM} for _, params in conn.executed)
+
+
+def test_inferred_members_filled_first(fake_conn, staged):
+    conn = fake_conn(rowcounts(inferred_keys=[501, 502], inserted=1))
+    counts = load_scd2(conn, 'dw.dim_product', batch(), 'productid', EFF,
+                       inferred_col='is_inferred', key_col='product_key')
+
+    assert counts['inferred'] == 2
+    assert counts['inferred_keys'] == [501, 502]
+    fill = conn.executed[0][0]
+    assert 'is_inferred = false' in fill and 't.is_inferred' in fill
+    assert fill.endswith('RETURNING t.product_key')
+    assert len(conn.executed) == 4
+    assert conn.executed[-1][0].startswith('INSERT')
+
+
+def test_inferred_without_key_col_returns_natural_key(fake_conn, staged):
+    conn = fake_conn(rowcounts(inferred_keys=[1]))
+    counts = load_scd2(conn, 'dw.dim_product', batch(), 'productid', EFF, inferred_col='is_inferred')
+    assert counts['inferred'] == 1 and 'inferred_keys' not in counts
+    assert conn.executed[0][0].endswith('RETURNING t.productid')
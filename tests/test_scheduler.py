@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from scheduler import critical_path, run_dag
+
+
+def test_run_dag_respects_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def task(name):
+        def run():
+            with lock:
+                order.append(name)
+            return name.upper()
+        return run
+
+    tasks = {
+        'dim_a': (task('dim_a'), []),
+        'dim_b': (task('dim_b'), []),
+        'fact': (task('fact'), ['dim_a', 'dim_b']),
+    }
+    results, timings = run_dag(tasks, max_workers=2)
+
+    assert results == {'dim_a': 'DIM_A', 'dim_b': 'DIM_B', 'fact': 'FACT'}
+    assert order[-1] == 'fact'
+    assert timings['fact'][0] >= max(timings['dim_a'][1], timings['dim_b'][1])
+
+
+def test_run_dag_rejects_unknown_dependency():
+    with pytest.raises(ValueError, match='inexistentes'):
+        run_dag({'fact': (lambda: None, ['dim_x'])})
+
+
+def test_run_dag_rejects_cycle():
+    tasks = {'a': (lambda: None, ['b']), 'b': (lambda: None, ['a'])}
+    with pytest.raises(ValueError, match='circular'):
+        run_dag(tasks)
+
+
+def test_run_dag_reraises_failure():
+    def boom():
+        raise RuntimeError('falhou')
+
+    tasks = {'dim': (boom, []), 'fact': (lambda: 'nunca', ['dim'])}
+    with pytest.raises(RuntimeError, match='falhou'):
+        run_dag(tasks)
+
+
+def test_critical_path_follows_latest_dependency():
+    tasks = {'a': (None, []), 'b': (None, []), 'fact': (None, ['a', 'b'])}
+    timings = {'a': (0.0, 1.0), 'b': (0.0, 3.0), 'fact': (3.0, 4.0)}
+    assert critical_path(tasks, timings) == ['b', 'fact']